@@ -1,5 +1,16 @@
+import sys
+
 from ncatbot.core import BotClient
 
+# 非 Windows 平台优先使用 uvloop 作为事件循环，降低每次 await 的开销
+if sys.platform != "win32":
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+
 # 创建 BotClient 实例
 bot = BotClient()
 
@@ -1,12 +1,18 @@
-import json
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-import aiofiles
 from typing import TypedDict, NotRequired
 import asyncio
+import time
 
 from ncatbot.utils import get_log
-from .constants import CACHE_SAVE_DELAY_SECONDS, WEB_START_TOKEN_TIMEOUT
+from .utils import json_dumps, json_loads
+from .constants import (
+    CACHE_SAVE_DELAY_SECONDS,
+    CACHE_WAL_COMPACT_SECONDS,
+    MAX_PENDING_NEW_GAMES,
+    WEB_START_TOKEN_TIMEOUT,
+)
 
 LOG = get_log(__name__)
 
@@ -18,9 +24,15 @@ class VoteCacheItem(TypedDict):
 
 
 class CacheManager:
-    def __init__(self, cache_path: Path):
-        self.cache_path = cache_path
-        self.pending_new_games: dict[str, dict] = {}
+    def __init__(self, cache_dir: Path):
+        # 分片存储：pending.json 保存待确认游戏，votes/{group_id}.json 保存各群投票，
+        # 每次只重写发生变化的分片；单条投票只追加到 votes.wal，定期合并回分片
+        self.cache_dir = cache_dir
+        self._pending_path = cache_dir / "pending.json"
+        self._votes_dir = cache_dir / "votes"
+        self._wal_path = cache_dir / "votes.wal"
+        self._legacy_path = cache_dir.with_suffix(".json")  # 旧版单文件缓存，仅用于迁移
+        self.pending_new_games: OrderedDict[str, dict] = OrderedDict()
         self.web_start_tokens: dict[str, dict] = {}  # token -> {group_id, user_id, created_at}
         self.vote_cache: dict[str, dict[str, VoteCacheItem]] = {}
         self._io_lock = asyncio.Lock()
@@ -28,6 +40,12 @@ class CacheManager:
         self._loaded = False  # 防止运行期被重复加载导致状态回退
         self._pending_save_task: asyncio.Task | None = None  # 待执行的保存任务
         self._save_requested = False  # 标记是否有保存请求
+        self._save_write_task: asyncio.Task | None = None  # 延迟保存中正在进行的写盘
+        self._pending_dirty = False  # pending.json 是否需要重写
+        self._dirty_groups: set[str] = set()  # 需要重写投票分片的群组
+        self._wal_buffer: list[str] = []  # 尚未追加到 WAL 的投票记录
+        self._wal_groups: set[str] = set()  # 自上次合并以来在 WAL 中有记录的群组
+        self._last_compaction = time.monotonic()
         # 缓存清理相关
         self._vote_cache_ttl = timedelta(hours=24)  # 投票缓存过期时间
         self._last_cleanup = datetime.now(timezone.utc)
@@ -37,7 +55,12 @@ class CacheManager:
     async def add_pending_game(self, message_id: str, game_data: dict):
         async with self._cache_lock:
             self.pending_new_games[message_id] = game_data
-        await self.save_to_disk()
+            self.pending_new_games.move_to_end(message_id)
+            # 限制待确认请求数量，防止刷屏上传导致内存无限增长
+            while len(self.pending_new_games) > MAX_PENDING_NEW_GAMES:
+                evicted_id, _ = self.pending_new_games.popitem(last=False)
+                LOG.warning(f"待处理游戏数量超过上限，已淘汰最早的请求 {evicted_id}")
+        await self.save_to_disk(pending=True)
 
     async def get_pending_game(self, message_id: str) -> dict | None:
         async with self._cache_lock:
@@ -46,12 +69,12 @@ class CacheManager:
     async def remove_pending_game(self, message_id: str):
         async with self._cache_lock:
             self.pending_new_games.pop(message_id, None)
-        await self.save_to_disk()
+        await self.save_to_disk(pending=True)
 
     async def clear_pending_games(self):
         async with self._cache_lock:
             self.pending_new_games.clear()
-        await self.save_to_disk(force=True)
+        await self.save_to_disk(force=True, pending=True)
 
     async def cleanup_expired_pending_games(self, timeout_seconds: int) -> set[str]:
         """清理所有过期的待处理游戏并返回被清理的 message_id 集合"""
@@ -72,7 +95,7 @@ class CacheManager:
             for msg_id in expired_ids:
                 self.pending_new_games.pop(msg_id, None)
 
-        await self.save_to_disk(force=True)
+        await self.save_to_disk(pending=True)
         return expired_ids
 
     # --- Web Start Tokens ---
@@ -127,15 +150,11 @@ class CacheManager:
 
     async def cleanup_expired_web_tokens(self, timeout_seconds: int = WEB_START_TOKEN_TIMEOUT):
         """清理过期的 Web 启动令牌 (默认10分钟)"""
-        should_save = False
         async with self._cache_lock:
             expired = self._cleanup_expired_tokens_unsafe(timeout_seconds)
             if expired:
                 LOG.debug(f"清理了 {len(expired)} 个过期的 Web 启动令牌")
-                should_save = True
-        
-        if should_save:
-            await self.save_to_disk()
+        # Web token 不持久化，无需保存
 
     # --- Vote Cache ---
     async def _maybe_cleanup_votes(self):
@@ -143,8 +162,12 @@ class CacheManager:
         now = datetime.now(timezone.utc)
         if now - self._last_cleanup < self._cleanup_interval:
             return
-        
+        await self.cleanup_expired_votes()
+
+    async def cleanup_expired_votes(self) -> int:
+        """清理所有过期的投票缓存并返回被清理的消息数量"""
         async with self._cache_lock:
+            now = datetime.now(timezone.utc)
             expired_groups = []
             total_expired_messages = 0
             
@@ -159,6 +182,8 @@ class CacheManager:
                 for msg_id in expired_messages:
                     messages.pop(msg_id, None)
                     total_expired_messages += 1
+                if expired_messages:
+                    self._dirty_groups.add(group_id)
                 
                 if not messages:
                     expired_groups.append(group_id)
@@ -171,6 +196,41 @@ class CacheManager:
             if expired_groups or total_expired_messages:
                 LOG.info(f"清理了 {len(expired_groups)} 个空群组和 {total_expired_messages} 条过期投票")
 
+        if total_expired_messages:
+            await self.save_to_disk()
+        return total_expired_messages
+
+    def _apply_vote_unsafe(
+        self,
+        group_id: str,
+        message_id: str,
+        emoji_id: str,
+        user_id: str,
+        is_add: bool,
+        timestamp: datetime,
+    ) -> bool:
+        """不加锁的投票更新，调用者需持有 _cache_lock；返回票数是否变化"""
+        group_cache = self.vote_cache.setdefault(group_id, {})
+        message_votes = group_cache.setdefault(message_id, {"votes": {}})
+        if "votes" not in message_votes:
+            message_votes["votes"] = {}
+        # 更新时间戳
+        message_votes["timestamp"] = timestamp
+        votes = message_votes["votes"]
+        if is_add:
+            vote_set = votes.setdefault(emoji_id, set())
+            changed = user_id not in vote_set
+            vote_set.add(user_id)
+        else:
+            vote_set = votes.get(emoji_id)
+            changed = vote_set is not None and user_id in vote_set
+            if changed:
+                vote_set.discard(user_id)
+                # 不保留空集合，计票时缺失即为 0 票
+                if not vote_set:
+                    del votes[emoji_id]
+        return changed
+
     async def update_vote(
         self, group_id: str, message_id: str, emoji_id: str, user_id: str, is_add: bool
     ):
@@ -178,21 +238,22 @@ class CacheManager:
         await self._maybe_cleanup_votes()
         
         async with self._cache_lock:
-            group_cache = self.vote_cache.setdefault(group_id, {})
-            message_votes = group_cache.setdefault(message_id, {
-                "votes": {},
-                "timestamp": datetime.now(timezone.utc)  # 添加时间戳
-            })
-            if "votes" not in message_votes:
-                message_votes["votes"] = {}
-            # 更新时间戳
-            message_votes["timestamp"] = datetime.now(timezone.utc)
-            vote_set = message_votes["votes"].setdefault(emoji_id, set())
-            if is_add:
-                vote_set.add(user_id)
-            else:
-                vote_set.discard(user_id)
-        await self.save_to_disk()
+            now = datetime.now(timezone.utc)
+            changed = self._apply_vote_unsafe(group_id, message_id, emoji_id, user_id, is_add, now)
+            if changed:
+                # 只记录这一条投票，由保存任务追加到 WAL，无需重写整个群组分片
+                self._wal_buffer.append(json_dumps({
+                    "g": group_id,
+                    "m": message_id,
+                    "e": emoji_id,
+                    "u": user_id,
+                    "a": is_add,
+                    "t": now.isoformat(),
+                }))
+                self._wal_groups.add(group_id)
+        # 重复的添加/移除事件不改变票数，无需落盘
+        if changed:
+            await self.save_to_disk()
 
     async def set_custom_input_content(
         self, group_id: str, message_id: str, content: str
@@ -201,7 +262,9 @@ class CacheManager:
             group_cache = self.vote_cache.setdefault(group_id, {})
             entry = group_cache.setdefault(message_id, {"votes": {}})
             entry["content"] = content
-        await self.save_to_disk(force=True)
+            # 记录时间戳，使无人投票的自定义输入也能按 TTL 过期
+            entry.setdefault("timestamp", datetime.now(timezone.utc))
+        await self.save_to_disk(group_id=group_id)
 
     async def get_vote_item(
         self, group_id: str, message_id: str
@@ -271,21 +334,108 @@ class CacheManager:
             group_cache = self.vote_cache.get(group_id)
             if group_cache is not None:
                 group_cache.pop(message_id, None)
-        await self.save_to_disk()
+        await self.save_to_disk(group_id=group_id)
 
     async def clear_group_vote_cache(self, group_id: str):
         async with self._cache_lock:
             if group_id in self.vote_cache:
                 self.vote_cache[group_id].clear()
-        await self.save_to_disk()
+        await self.save_to_disk(group_id=group_id)
+
+    @staticmethod
+    def _restore_pending_games(raw: dict) -> OrderedDict[str, dict]:
+        pending = OrderedDict(raw)
+        for game in pending.values():
+            if "create_time" in game and isinstance(game["create_time"], str):
+                game["create_time"] = datetime.fromisoformat(game["create_time"])
+        return pending
+
+    @staticmethod
+    def _restore_group_votes(raw: dict) -> dict[str, VoteCacheItem]:
+        messages: dict[str, VoteCacheItem] = {}
+        for msg_id, item_payload in raw.items():
+            item: VoteCacheItem = {"votes": {}}
+            if "content" in item_payload and item_payload["content"] is not None:
+                item["content"] = item_payload["content"]
+            if "votes" in item_payload:
+                item["votes"] = {str(k): set(v) for k, v in item_payload["votes"].items()}
+            # 恢复时间戳
+            ts = item_payload.get("timestamp")
+            if ts:
+                item["timestamp"] = datetime.fromisoformat(ts)
+            messages[msg_id] = item
+        return messages
+
+    @staticmethod
+    async def _read_json(path: Path):
+        # 整个文件在线程池中一次读完，避免 aiofiles 的多次线程往返
+        return json_loads(await asyncio.to_thread(path.read_bytes))
+
+    @staticmethod
+    def _write_files(
+        votes_dir: Path, files: list[tuple[Path, str | None]], wal_path: Path | None
+    ) -> dict[Path, Exception]:
+        """
+        在工作线程中写入（内容为 None 时删除）一批分片文件，返回写入失败的文件。
+
+        传入 wal_path 时表示这是一次合并：全部分片写入成功后才清空 WAL。
+        """
+        votes_dir.mkdir(parents=True, exist_ok=True)
+        errors: dict[Path, Exception] = {}
+        for path, text in files:
+            try:
+                if text is None:
+                    path.unlink(missing_ok=True)
+                else:
+                    path.write_text(text, encoding="utf-8")
+            except Exception as e:
+                errors[path] = e
+        if wal_path is not None and not errors:
+            wal_path.write_bytes(b"")
+        return errors
+
+    @staticmethod
+    def _append_wal(wal_path: Path, lines: list[str]):
+        wal_path.parent.mkdir(parents=True, exist_ok=True)
+        with wal_path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _replay_wal_unsafe(self, content: str) -> int:
+        """将 WAL 中的投票记录重放到内存缓存，调用者需持有 _cache_lock"""
+        replayed = 0
+        for line in content.splitlines():
+            if not line:
+                continue
+            try:
+                entry = json_loads(line)
+                self._apply_vote_unsafe(
+                    entry["g"],
+                    entry["m"],
+                    entry["e"],
+                    entry["u"],
+                    entry["a"],
+                    datetime.fromisoformat(entry["t"]),
+                )
+            except Exception as e:
+                # 进程崩溃可能留下半行记录，跳过即可
+                LOG.warning(f"跳过无法解析的投票 WAL 记录: {e}")
+                continue
+            self._wal_groups.add(entry["g"])
+            replayed += 1
+        return replayed
 
     async def load_from_disk(self):
-        """从磁盘加载缓存文件"""
+        """从磁盘加载缓存（分片目录，或迁移旧版单文件缓存）"""
         # 防止运行期再次调用把内存状态覆盖回旧盘态
         if self._loaded:
             LOG.warning("缓存已加载过，重复加载被忽略。")
             return
-        if not self.cache_path or not self.cache_path.exists():
+        if not self.cache_dir:
+            self._loaded = True
+            return
+
+        migrate_legacy = not self.cache_dir.exists() and self._legacy_path.exists()
+        if not self.cache_dir.exists() and not migrate_legacy:
             self._loaded = True
             return
 
@@ -293,106 +443,150 @@ class CacheManager:
         async with self._cache_lock:
             async with self._io_lock:
                 try:
-                    async with aiofiles.open(self.cache_path, "r", encoding="utf-8") as f:
-                        content = await f.read()
-                        payload = json.loads(content)
-
                     # 先在本地变量里"组装好"恢复结果
-                    pending_new_games_restored = payload.get("pending_new_games", {})
-                    for key, game in pending_new_games_restored.items():
-                        if "create_time" in game and isinstance(game["create_time"], str):
-                            game["create_time"] = datetime.fromisoformat(game["create_time"])
-
-                    # web_start_tokens 不再持久化，启动时为空
-                    web_start_tokens_restored = {}
-
-                    raw_vote_cache = payload.get("vote_cache", {})
                     vote_cache_restored: dict[str, dict[str, VoteCacheItem]] = {}
-                    for group_id, messages in raw_vote_cache.items():
-                        vote_cache_restored[group_id] = {}
-                        for msg_id, item_payload in messages.items():
-                            item: VoteCacheItem = {"votes": {}}
-                            if "content" in item_payload and item_payload["content"] is not None:
-                                item["content"] = item_payload["content"]
-                            if "votes" in item_payload:
-                                item["votes"] = {str(k): set(v) for k, v in item_payload["votes"].items()}
-                            # 恢复时间戳
-                            ts = item_payload.get("timestamp")
-                            if ts:
-                                item["timestamp"] = datetime.fromisoformat(ts)
-                            vote_cache_restored[group_id][msg_id] = item
+                    if migrate_legacy:
+                        payload = await self._read_json(self._legacy_path)
+                        pending_new_games_restored = self._restore_pending_games(
+                            payload.get("pending_new_games", {})
+                        )
+                        for group_id, messages in payload.get("vote_cache", {}).items():
+                            vote_cache_restored[group_id] = self._restore_group_votes(messages)
+                    else:
+                        pending_new_games_restored = OrderedDict()
+                        if self._pending_path.exists():
+                            pending_new_games_restored = self._restore_pending_games(
+                                await self._read_json(self._pending_path)
+                            )
+                        for group_path in self._votes_dir.glob("*.json"):
+                            vote_cache_restored[group_path.stem] = self._restore_group_votes(
+                                await self._read_json(group_path)
+                            )
 
                     # 直接更新内存状态（已在 _cache_lock 保护下）
+                    # web_start_tokens 不持久化，启动时为空
                     self.pending_new_games = pending_new_games_restored
-                    self.web_start_tokens = web_start_tokens_restored
+                    self.web_start_tokens = {}
                     self.vote_cache = vote_cache_restored
 
+                    # 重放上次合并之后追加的投票记录
+                    if not migrate_legacy and self._wal_path.exists():
+                        wal_content = await asyncio.to_thread(
+                            self._wal_path.read_text, encoding="utf-8"
+                        )
+                        replayed = self._replay_wal_unsafe(wal_content)
+                        if replayed:
+                            LOG.info(f"已从 WAL 重放 {replayed} 条投票记录。")
+
                 except Exception as e:
                     LOG.error(f"从磁盘加载缓存失败: {e}", exc_info=True)
                     # 即使失败也标为已尝试加载，避免运行中再次触发
                     self._loaded = True
                     return
 
-        LOG.info("成功从磁盘加载缓存。")
         self._loaded = True
+        if migrate_legacy:
+            # 将旧版单文件缓存完整写入分片目录，之后不再读取旧文件
+            LOG.info(f"已将旧版缓存文件 {self._legacy_path} 迁移为分片存储。")
+            self._dirty_groups.update(self.vote_cache)
+            await self.save_to_disk(force=True, pending=True)
+        LOG.info("成功从磁盘加载缓存。")
 
     async def _delayed_save_worker(self):
         """
         延迟保存工作协程。
         
         等待指定时间后执行实际保存，期间的所有保存请求会被合并。
+        写盘过程中到达的新请求由同一任务在下一轮处理，不会丢失。
         """
-        await asyncio.sleep(CACHE_SAVE_DELAY_SECONDS)
-        await self._do_save_to_disk()
+        while self._save_requested:
+            await asyncio.sleep(CACHE_SAVE_DELAY_SECONDS)
+            # 写盘阶段不可取消：快照取走 WAL 记录与脏标记后被取消会丢失这些变化，
+            # 且取消 to_thread 会在线程仍在写文件时释放 _io_lock
+            self._save_write_task = asyncio.create_task(self._do_save_to_disk())
+            await asyncio.shield(self._save_write_task)
+
+    async def _do_save_to_disk(self, compact: bool = False):
+        """
+        将缓存变化写入磁盘。
 
-    async def _do_save_to_disk(self):
-        """执行实际的磁盘保存操作"""
-        if not self.cache_path:
+        仅有投票变化时把新记录追加到 WAL；待确认游戏或群组分片需要重写、
+        距上次合并超过 CACHE_WAL_COMPACT_SECONDS，或 compact=True 时执行合并：
+        重写所有脏分片以及 WAL 中涉及的群组，然后清空 WAL。
+        """
+        if not self.cache_dir:
             return
 
         # 先在 _cache_lock 下做"稳定快照/序列化材料"，避免读到半更新状态
         async with self._cache_lock:
             self._save_requested = False  # 重置保存请求标记
-            
-            # 构造可序列化的 pending_new_games
-            serializable_pending = {}
-            for key, game in self.pending_new_games.items():
-                game_data = game.copy()
-                if "create_time" in game_data and isinstance(game_data["create_time"], datetime):
-                    game_data["create_time"] = game_data["create_time"].isoformat()
-                serializable_pending[key] = game_data
-
-            # 构造可序列化的 vote_cache（set -> list）
-            serializable_votes = {}
-            for group_id, messages in self.vote_cache.items():
-                serializable_votes[group_id] = {}
-                for msg_id, item in messages.items():
-                    vote_item = {
-                        "content": item.get("content"),
-                        "votes": {emoji_id: list(users) for emoji_id, users in item.get("votes", {}).items()},
-                    }
-                    # 持久化时间戳（仅在存在时写入）
-                    timestamp = item.get("timestamp")
-                    if timestamp:
-                        vote_item["timestamp"] = timestamp.isoformat()
-                    serializable_votes[group_id][msg_id] = vote_item
-
-            data = {
-                "pending_new_games": serializable_pending,
-                # "web_start_tokens": serializable_tokens,  # Token 仅存在于内存中，不持久化
-                "vote_cache": serializable_votes,
-            }
+            compact = (
+                compact
+                or self._pending_dirty
+                or bool(self._dirty_groups)
+                or time.monotonic() - self._last_compaction >= CACHE_WAL_COMPACT_SECONDS
+            )
+            wal_lines = self._wal_buffer
+            self._wal_buffer = []
+            if not compact:
+                wal_groups: set[str] = set()
+            else:
+                wal_groups = self._wal_groups
+                self._wal_groups = set()
+                self._last_compaction = time.monotonic()
+            save_pending = self._pending_dirty
+            dirty_groups = self._dirty_groups | wal_groups if compact else set()
+            self._pending_dirty = False
+            self._dirty_groups = set()
+
+            # 直接序列化内存结构：集合与 datetime 由 json_dumps 处理（orjson 下在 C 中完成），
+            # 无需先构造一份可序列化的副本
+            files: list[tuple[Path, str | None]] = []
+            if save_pending:
+                files.append((self._pending_path, json_dumps(self.pending_new_games)))
+            for group_id in dirty_groups:
+                messages = self.vote_cache.get(group_id)
+                # 空群组对应的分片直接删除
+                files.append((self._votes_dir / f"{group_id}.json", json_dumps(messages) if messages else None))
+
+        if not compact:
+            if not wal_lines:
+                return
+            async with self._io_lock:
+                try:
+                    await asyncio.to_thread(self._append_wal, self._wal_path, wal_lines)
+                except Exception as e:
+                    # 追加失败时改为在下次保存时重写这些群组的分片
+                    self._dirty_groups.update(json_loads(line)["g"] for line in wal_lines)
+                    LOG.error(f"追加投票 WAL 失败: {e}")
+            return
+
+        if not files and not wal_lines:
+            return
 
         # 再拿 _io_lock 做写盘（注意锁顺序统一：先 _cache_lock 再 _io_lock）
+        # 所有分片在同一次线程池调用中写完
         async with self._io_lock:
             try:
-                async with aiofiles.open(self.cache_path, "w", encoding="utf-8") as f:
-                    await f.write(json.dumps(data, indent=4, ensure_ascii=False))
-                LOG.debug("缓存已成功保存到磁盘")
+                errors = await asyncio.to_thread(
+                    self._write_files, self._votes_dir, files, self._wal_path
+                )
             except Exception as e:
-                LOG.error(f"保存缓存到磁盘失败: {e}", exc_info=True)
+                errors = {path: e for path, _ in files}
 
-    async def save_to_disk(self, force: bool = False):
+        for path, e in errors.items():
+            # 标记为脏，下次保存时重试（WAL 未被清空，崩溃时仍可恢复）
+            if path == self._pending_path:
+                self._pending_dirty = True
+                LOG.error(f"保存待处理游戏缓存失败: {e}")
+            else:
+                self._dirty_groups.add(path.stem)
+                LOG.error(f"保存群 {path.stem} 的投票缓存失败: {e}")
+        LOG.debug(f"缓存已合并到磁盘（{len(dirty_groups)} 个群组分片）")
+
+    async def save_to_disk(
+        self, force: bool = False, *, pending: bool = False, group_id: str | None = None
+    ):
         """
         请求保存缓存到磁盘。
         
@@ -404,12 +598,19 @@ class CacheManager:
         
         Args:
             force: 是否强制立即保存
+            pending: 待确认游戏是否发生变化
+            group_id: 投票缓存发生变化的群组
         """
-        if not self.cache_path:
+        if not self.cache_dir:
             return
 
+        if pending:
+            self._pending_dirty = True
+        if group_id is not None:
+            self._dirty_groups.add(group_id)
+
         if force:
-            # 强制保存：取消待执行的任务并立即保存
+            # 强制保存：取消仍在等待的延迟任务，等待已开始的写盘完成后立即保存
             if self._pending_save_task and not self._pending_save_task.done():
                 self._pending_save_task.cancel()
                 try:
@@ -417,6 +618,12 @@ class CacheManager:
                 except asyncio.CancelledError:
                     pass
             self._pending_save_task = None
+            if self._save_write_task and not self._save_write_task.done():
+                try:
+                    await self._save_write_task
+                except Exception as e:
+                    LOG.error(f"延迟保存任务写盘失败: {e}")
+            self._save_write_task = None
             await self._do_save_to_disk()
         else:
             # 延迟保存：防止重复创建任务
@@ -442,13 +649,16 @@ class CacheManager:
                 await self._pending_save_task
                 LOG.info("待执行的缓存保存任务已完成")
             except asyncio.CancelledError:
-                # 如果任务被取消，强制保存一次
                 LOG.warning("缓存保存任务被取消，执行最终强制保存")
-                await self._do_save_to_disk()
             except Exception as e:
                 LOG.error(f"等待缓存保存任务时出错: {e}，执行最终强制保存")
-                await self._do_save_to_disk()
-        elif self._save_requested:
-            # 如果有保存请求但任务已完成或不存在，执行最终保存
-            LOG.info("执行最终缓存保存")
-            await self._do_save_to_disk()
+
+        # 延迟任务被取消时其写盘可能仍在进行，等待其完成
+        if self._save_write_task and not self._save_write_task.done():
+            try:
+                await self._save_write_task
+            except Exception as e:
+                LOG.error(f"延迟保存任务写盘失败: {e}")
+
+        # 最终合并一次：把 WAL 中的投票写回分片，下次启动无需重放
+        await self._do_save_to_disk(compact=True)
@@ -21,7 +21,7 @@ from .game_manager import GameManager
 from .cache import CacheManager
 from .visualizer import Visualizer
 from .renderer import MarkdownRenderer
-from .utils import bytes_to_base64
+from .utils import config_flag, png_data_uri
 from .constants import HISTORY_MAX_LIMIT
 from .web_ui import WebUI
 from .channel_config import ChannelConfigManager
@@ -149,7 +149,7 @@ class CommandHandler:
             if image_bytes:
                 await self.api.post_group_file(
                     str(event.group_id),
-                    image=f"data:image/png;base64,{bytes_to_base64(image_bytes)}",
+                    image=png_data_uri(image_bytes),
                 )
             else:
                 await event.reply("❌ 生成帮助图片失败，请检查日志。", at=False)
@@ -237,7 +237,7 @@ class CommandHandler:
         if image_bytes:
             await self.api.post_group_file(
                 group_id,
-                image=f"data:image/png;base64,{bytes_to_base64(image_bytes)}",
+                image=png_data_uri(image_bytes),
             )
         else:
             await event.reply("生成分支图失败，请检查日志。", at=False)
@@ -282,15 +282,15 @@ class CommandHandler:
             except (json.JSONDecodeError, TypeError):
                 LOG.warning(f"无法解析 llm_usage: {llm_usage_str}")
         await event.reply(f"正在渲染 Round {round_id} 的内容...", at=False)
-        image_bytes = await self.renderer.render_markdown(
+        image_uri = await self.renderer.render_markdown_image_uri(
             round_info["assistant_response"],
             extra_text=extra_text
         )
 
-        if image_bytes:
+        if image_uri:
             await self.api.post_group_file(
                 str(event.group_id),
-                image=f"data:image/png;base64,{bytes_to_base64(image_bytes)}",
+                image=image_uri,
             )
         else:
             await event.reply("渲染内容失败，请检查日志。", at=False)
@@ -347,14 +347,14 @@ class CommandHandler:
             )
 
             # 3. 将合并后的 Markdown 渲染为一张图片
-            image_bytes = await self.renderer.render_markdown(
+            image_uri = await self.renderer.render_markdown_image_uri(
                 combined_markdown,
                 extra_text=extra_text
             )
 
             # 4. 将图片附加到合并转发构造器中
-            if image_bytes:
-                node_content = MessageArray([Image(f"data:image/png;base64,{bytes_to_base64(image_bytes)}")])
+            if image_uri:
+                node_content = MessageArray([Image(image_uri)])
                 fcr.attach(node_content)
             else:
                 # 如果渲染失败，则回退到文本
@@ -1122,6 +1122,12 @@ class CommandHandler:
             else:
                 msg += "⚪ Fallback: 无\n"
 
+            if config_flag(self.plugin.config, "llm_response_cache"):
+                msg += (
+                    f"🗃️ 响应缓存: 命中 {self.game_manager.llm_cache_hits} 次，"
+                    f"未命中 {self.game_manager.llm_cache_misses} 次\n"
+                )
+
         if msg:
             await event.reply(msg)
 
@@ -1,3 +1,5 @@
+import asyncio
+
 from ncatbot.plugin_system import NcatBotPlugin
 from ncatbot.utils import get_log
 
@@ -27,3 +29,12 @@ class ContentFetcher:
                 LOG.warning(f"获取消息 {message_id} 内容失败: {e}")
                 content = f"自定义输入 (ID: {message_id})"
         return content
+
+    async def get_custom_input_contents(
+        self, group_id: str, message_ids: list[str]
+    ) -> dict[str, str]:
+        """并发获取多条自定义输入的内容，返回 message_id -> 内容 的映射"""
+        contents = await asyncio.gather(
+            *(self.get_custom_input_content(group_id, mid) for mid in message_ids)
+        )
+        return dict(zip(message_ids, contents))
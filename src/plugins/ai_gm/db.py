@@ -6,7 +6,12 @@ from contextvars import ContextVar
 import uuid
 import time
 
-from .constants import DB_BUSY_TIMEOUT_MS, DB_WAL_AUTOCHECKPOINT
+from .constants import (
+    DB_BUSY_TIMEOUT_MS,
+    DB_WAL_AUTOCHECKPOINT,
+    DB_CACHE_SIZE_KIB,
+    DB_MMAP_SIZE,
+)
 
 LOG = get_log(__name__)
 
@@ -15,9 +20,13 @@ _transaction_depth: ContextVar[int] = ContextVar('transaction_depth', default=0)
 
 
 class Database:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, cache_games: bool = False):
         self.db_path = db_path
         self.conn: aiosqlite.Connection | None = None
+        # games 行按 channel_id 缓存（含"无游戏"的 None），仅在本实例是唯一写入者时开启
+        self._cache_games = cache_games
+        self._game_cache: dict[str, aiosqlite.Row | None] = {}
+        self._game_cache_generation = 0  # 每次失效递增，防止并发读把旧行写回缓存
         self._connection_healthy = True
         self._last_health_check = 0.0
         self._health_check_interval = 60.0  # 60秒检查一次连接健康
@@ -27,6 +36,11 @@ class Database:
         """设置健康检查间隔时间"""
         self._health_check_interval = interval
 
+    def _invalidate_game_cache(self):
+        """清空 games 行缓存，任何 games 写入或事务回滚后调用"""
+        self._game_cache.clear()
+        self._game_cache_generation += 1
+
     async def connect(self):
         """连接到数据库并进行初始化"""
         try:
@@ -37,6 +51,10 @@ class Database:
             await self.conn.execute("PRAGMA foreign_keys = ON;")
             await self.conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS};")
             await self.conn.execute(f"PRAGMA wal_autocheckpoint={DB_WAL_AUTOCHECKPOINT};")
+            # 负数表示以 KiB 为单位；临时表和排序放在内存中，读路径走 mmap
+            await self.conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KIB};")
+            await self.conn.execute("PRAGMA temp_store=MEMORY;")
+            await self.conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE};")
             await self.init_db()
             LOG.info(f"成功连接并初始化数据库: {self.db_path}")
         except aiosqlite.Error as e:
@@ -97,6 +115,8 @@ class Database:
         """关闭数据库连接"""
         if self.conn:
             try:
+                # 按需刷新查询规划器的统计信息
+                await self.conn.execute("PRAGMA optimize;")
                 # 执行 WAL checkpoint，将日志合并到主数据库
                 await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
                 await self.conn.commit()
@@ -160,12 +180,35 @@ class Database:
                     assistant_response TEXT NOT NULL,
                     llm_usage TEXT,
                     model_name TEXT,
+                    parent_path TEXT,
                     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (game_id) REFERENCES games (game_id) ON DELETE CASCADE
                 );
             """
             )
 
+            # 迁移：旧库补充 parent_path 列（祖先 round_id 路径，形如 "1/5/"，不含自身）
+            await cursor.execute("PRAGMA table_info(rounds)")
+            round_columns = {row[1] for row in await cursor.fetchall()}
+            if "parent_path" not in round_columns:
+                LOG.info("为 rounds 表添加 parent_path 列...")
+                await cursor.execute("ALTER TABLE rounds ADD COLUMN parent_path TEXT")
+
+            # 回填缺失的 parent_path
+            await cursor.execute(
+                """
+                WITH RECURSIVE paths(round_id, path) AS (
+                    SELECT round_id, '' FROM rounds WHERE parent_id = -1
+                    UNION ALL
+                    SELECT r.round_id, p.path || p.round_id || '/'
+                    FROM rounds r JOIN paths p ON r.parent_id = p.round_id
+                )
+                UPDATE rounds
+                SET parent_path = (SELECT path FROM paths WHERE paths.round_id = rounds.round_id)
+                WHERE parent_path IS NULL;
+            """
+            )
+
             # 创建 tags 表
             await cursor.execute(
                 """
@@ -182,6 +225,18 @@ class Database:
                 """
             )
 
+            # 创建 llm_cache 表（可选的 LLM 响应缓存，键为模型与完整上下文的摘要）
+            await cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    model_name TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                """
+            )
+
             # 创建触发器，用于自动更新 games 表的 updated_at
             await cursor.execute(
                 """
@@ -221,6 +276,9 @@ class Database:
             await cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_rounds_parent ON rounds(parent_id);"
             )
+            await cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_branches_tip ON branches(tip_round_id);"
+            )
             await cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_tags_game ON tags(game_id);"
             )
@@ -228,6 +286,13 @@ class Database:
                 "CREATE INDEX IF NOT EXISTS idx_tags_round_id ON tags(round_id);"
             )
 
+            # 首次建库时收集一次统计信息，之后由关闭时的 PRAGMA optimize 维护
+            await cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            )
+            if not await cursor.fetchone():
+                await cursor.execute("ANALYZE;")
+
         if self.conn:
             await self.conn.commit()
 
@@ -267,6 +332,7 @@ class Database:
                     await self.conn.commit()
                 except Exception:
                     await self.conn.rollback()
+                    self._invalidate_game_cache()
                     raise
                 finally:
                     _transaction_depth.set(depth)
@@ -283,6 +349,7 @@ class Database:
                 except Exception:
                     # 发生异常时回滚到 savepoint
                     await self.conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint_name};")
+                    self._invalidate_game_cache()
                     # 尝试释放 savepoint
                     try:
                         await self.conn.execute(f"RELEASE SAVEPOINT {savepoint_name};")
@@ -306,6 +373,8 @@ class Database:
         Raises:
             RuntimeError: 如果数据库连接失败
         """
+        if self._cache_games:
+            return await self.get_game_by_channel_id(channel_id) is not None
         await self._ensure_conn_or_raise()
         assert self.conn is not None
         async with self.conn.execute(
@@ -327,12 +396,18 @@ class Database:
         Raises:
             RuntimeError: 如果数据库未连接
         """
+        if self._cache_games and channel_id in self._game_cache:
+            return self._game_cache[channel_id]
+        generation = self._game_cache_generation
         await self._ensure_conn_or_raise()
         assert self.conn is not None
         async with self.conn.execute(
             "SELECT * FROM games WHERE channel_id = ?", (channel_id,)
         ) as cursor:
-            return await cursor.fetchone()
+            row = await cursor.fetchone()
+        if self._cache_games and generation == self._game_cache_generation:
+            self._game_cache[channel_id] = row
+        return row
 
     async def get_game_by_game_id(self, game_id: int):
         """
@@ -354,29 +429,96 @@ class Database:
         ) as cursor:
             return await cursor.fetchone()
 
+    async def get_game_with_head_tip(self, game_id: int):
+        """
+        通过 game_id 获取游戏信息，并附带其 HEAD 分支的 tip_round_id。
+        
+        Args:
+            game_id: 游戏ID
+            
+        Returns:
+            aiosqlite.Row | None: games 表的所有列加上 tip_round_id（HEAD 未设置时为 None），
+            如果游戏不存在则返回 None
+            
+        Raises:
+            RuntimeError: 如果数据库未连接
+        """
+        await self._ensure_conn_or_raise()
+        assert self.conn is not None
+        async with self.conn.execute(
+            """SELECT g.*, b.tip_round_id
+               FROM games g
+               LEFT JOIN branches b ON g.head_branch_id = b.branch_id
+               WHERE g.game_id = ?""",
+            (game_id,),
+        ) as cursor:
+            return await cursor.fetchone()
+
     async def set_game_frozen_status(self, game_id: int, is_frozen: bool):
         """设置游戏的冻结状态"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE games SET is_frozen = ? WHERE game_id = ?",
-                    (is_frozen, game_id),
+            await self.conn.execute(
+                "UPDATE games SET is_frozen = ? WHERE game_id = ?",
+                (is_frozen, game_id),
+            )
+            self._invalidate_game_cache()
+
+    async def append_candidate_custom_input_id(
+        self, game_id: int, main_message_id: str, message_id: str
+    ) -> bool:
+        """
+        在数据库内原子地向候选自定义输入列表追加一个消息ID。
+
+        仅当主消息仍为 main_message_id 时生效，避免与检出新回合并发时
+        把旧回合的输入写进新列表。
+
+        Returns:
+            bool: 是否追加成功
+        """
+        if not self.conn:
+            raise RuntimeError("数据库未连接")
+        async with self.transaction():
+            cursor = await self.conn.execute(
+                """
+                UPDATE games
+                SET candidate_custom_input_ids = json_insert(
+                    COALESCE(candidate_custom_input_ids, '[]'), '$[#]', ?
                 )
+                WHERE game_id = ? AND main_message_id = ?
+                """,
+                (message_id, game_id, main_message_id),
+            )
+            self._invalidate_game_cache()
+            return cursor.rowcount > 0
 
-    async def update_candidate_custom_input_ids(
-        self, game_id: int, candidate_ids_json: str
-    ):
-        """更新候选自定义输入ID"""
+    async def remove_candidate_custom_input_id(self, game_id: int, message_id: str) -> bool:
+        """
+        在数据库内原子地从候选自定义输入列表移除一个消息ID。
+
+        Returns:
+            bool: 该ID是否在列表中并已被移除
+        """
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE games SET candidate_custom_input_ids = ? WHERE game_id = ?",
-                    (candidate_ids_json, game_id),
+            cursor = await self.conn.execute(
+                """
+                UPDATE games
+                SET candidate_custom_input_ids = (
+                    SELECT json_group_array(value)
+                    FROM json_each(games.candidate_custom_input_ids)
+                    WHERE value != ?
                 )
+                WHERE game_id = ? AND EXISTS (
+                    SELECT 1 FROM json_each(games.candidate_custom_input_ids) WHERE value = ?
+                )
+                """,
+                (message_id, game_id, message_id),
+            )
+            self._invalidate_game_cache()
+            return cursor.rowcount > 0
 
     async def get_host_user_id(self, channel_id: str) -> str | None:
         """
@@ -391,6 +533,9 @@ class Database:
         Raises:
             RuntimeError: 如果数据库未连接
         """
+        if self._cache_games:
+            game = await self.get_game_by_channel_id(channel_id)
+            return game["host_user_id"] if game else None
         await self._ensure_conn_or_raise()
         assert self.conn is not None
         async with self.conn.execute(
@@ -406,14 +551,14 @@ class Database:
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO games (channel_id, host_user_id, system_prompt) VALUES (?, ?, ?)",
-                    (channel_id, user_id, system_prompt),
-                )
-                if cursor.lastrowid is None:
-                    raise RuntimeError("插入游戏数据失败")
-                return cursor.lastrowid
+            cursor = await self.conn.execute(
+                "INSERT INTO games (channel_id, host_user_id, system_prompt) VALUES (?, ?, ?)",
+                (channel_id, user_id, system_prompt),
+            )
+            self._invalidate_game_cache()
+            if cursor.lastrowid is None:
+                raise RuntimeError("插入游戏数据失败")
+            return cursor.lastrowid
 
     async def create_round(
         self,
@@ -428,21 +573,29 @@ class Database:
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO rounds (game_id, parent_id, player_choice, assistant_response, llm_usage, model_name) VALUES (?, ?, ?, ?, ?, ?)",
-                    (
-                        game_id,
-                        parent_id,
-                        player_choice,
-                        assistant_response,
-                        llm_usage,
-                        model_name,
-                    ),
-                )
-                if cursor.lastrowid is None:
-                    raise RuntimeError("插入回合数据失败")
-                return cursor.lastrowid
+            # parent_path 在同一条 INSERT 中由父回合的路径拼接得出；根回合为空路径。
+            # 父回合缺少路径时保持 NULL（读取祖先时回退到递归查询），不能当作根回合
+            cursor = await self.conn.execute(
+                """
+                INSERT INTO rounds (game_id, parent_id, player_choice, assistant_response, llm_usage, model_name, parent_path)
+                VALUES (?, ?, ?, ?, ?, ?, CASE WHEN ? = -1 THEN '' ELSE
+                    (SELECT parent_path || round_id || '/' FROM rounds WHERE round_id = ?)
+                END)
+                """,
+                (
+                    game_id,
+                    parent_id,
+                    player_choice,
+                    assistant_response,
+                    llm_usage,
+                    model_name,
+                    parent_id,
+                    parent_id,
+                ),
+            )
+            if cursor.lastrowid is None:
+                raise RuntimeError("插入回合数据失败")
+            return cursor.lastrowid
 
     async def create_branch(
         self, game_id: int, name: str, tip_round_id: int
@@ -451,25 +604,24 @@ class Database:
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO branches (game_id, name, tip_round_id) VALUES (?, ?, ?)",
-                    (game_id, name, tip_round_id),
-                )
-                if cursor.lastrowid is None:
-                    raise RuntimeError("插入分支数据失败")
-                return cursor.lastrowid
+            cursor = await self.conn.execute(
+                "INSERT INTO branches (game_id, name, tip_round_id) VALUES (?, ?, ?)",
+                (game_id, name, tip_round_id),
+            )
+            if cursor.lastrowid is None:
+                raise RuntimeError("插入分支数据失败")
+            return cursor.lastrowid
 
     async def update_game_head_branch(self, game_id: int, branch_id: int):
         """更新游戏的 head_branch_id"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE games SET head_branch_id = ? WHERE game_id = ?",
-                    (branch_id, game_id),
-                )
+            await self.conn.execute(
+                "UPDATE games SET head_branch_id = ? WHERE game_id = ?",
+                (branch_id, game_id),
+            )
+            self._invalidate_game_cache()
 
     async def get_game_and_head_branch_info(self, game_id: int):
         """
@@ -479,7 +631,8 @@ class Database:
             game_id: 游戏ID
             
         Returns:
-            aiosqlite.Row: 包含 channel_id 和 tip_round_id 的记录
+            aiosqlite.Row: 包含 channel_id、head_branch_id、tip_round_id 以及
+                tip 回合的 parent_id（列名 tip_parent_id）的记录
             
         Raises:
             RuntimeError: 如果数据库未连接或游戏 head 分支未设置
@@ -487,9 +640,10 @@ class Database:
         await self._ensure_conn_or_raise()
         assert self.conn is not None
         async with self.conn.execute(
-            """SELECT g.channel_id, b.tip_round_id
+            """SELECT g.channel_id, g.head_branch_id, b.tip_round_id, r.parent_id AS tip_parent_id
                FROM games g
                LEFT JOIN branches b ON g.head_branch_id = b.branch_id
+               LEFT JOIN rounds r ON r.round_id = b.tip_round_id
                WHERE g.game_id = ?""",
             (game_id,),
         ) as cursor:
@@ -523,49 +677,46 @@ class Database:
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE games SET main_message_id = ?, candidate_custom_input_ids = '[]' WHERE game_id = ?",
-                    (main_message_id, game_id),
-                )
+            await self.conn.execute(
+                "UPDATE games SET main_message_id = ?, candidate_custom_input_ids = '[]' WHERE game_id = ?",
+                (main_message_id, game_id),
+            )
+            self._invalidate_game_cache()
 
     async def update_branch_tip(self, branch_id: int, round_id: int):
         """更新分支的 tip_round_id (用于推进或回退)"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE branches SET tip_round_id = ? WHERE branch_id = ?",
-                    (round_id, branch_id),
-                )
+            await self.conn.execute(
+                "UPDATE branches SET tip_round_id = ? WHERE branch_id = ?",
+                (round_id, branch_id),
+            )
 
     async def rename_branch(self, branch_id: int, new_name: str):
         """重命名分支"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE branches SET name = ? WHERE branch_id = ?",
-                    (new_name, branch_id),
-                )
+            await self.conn.execute(
+                "UPDATE branches SET name = ? WHERE branch_id = ?",
+                (new_name, branch_id),
+            )
 
     async def delete_branch(self, branch_id: int):
         """删除分支"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute("DELETE FROM branches WHERE branch_id = ?", (branch_id,))
+            await self.conn.execute("DELETE FROM branches WHERE branch_id = ?", (branch_id,))
 
     async def delete_game(self, game_id: int):
         """删除游戏"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+            await self.conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+            self._invalidate_game_cache()
 
     async def get_all_games(self):
         """
@@ -672,14 +823,13 @@ class Database:
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO tags (game_id, name, round_id) VALUES (?, ?, ?)",
-                    (game_id, name, round_id),
-                )
-                if cursor.lastrowid is None:
-                    raise RuntimeError("插入标签数据失败")
-                return cursor.lastrowid
+            cursor = await self.conn.execute(
+                "INSERT INTO tags (game_id, name, round_id) VALUES (?, ?, ?)",
+                (game_id, name, round_id),
+            )
+            if cursor.lastrowid is None:
+                raise RuntimeError("插入标签数据失败")
+            return cursor.lastrowid
 
     async def get_tag_by_name(self, game_id: int, name: str):
         """
@@ -728,53 +878,53 @@ class Database:
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "DELETE FROM tags WHERE game_id = ? AND name = ?", (game_id, name)
-                )
+            await self.conn.execute(
+                "DELETE FROM tags WHERE game_id = ? AND name = ?", (game_id, name)
+            )
 
     async def attach_game_to_channel(self, game_id: int, channel_id: str):
         """将游戏附加到频道"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE games SET channel_id = ? WHERE game_id = ?",
-                    (channel_id, game_id),
-                )
+            await self.conn.execute(
+                "UPDATE games SET channel_id = ? WHERE game_id = ?",
+                (channel_id, game_id),
+            )
+            self._invalidate_game_cache()
 
     async def detach_game_from_channel(self, game_id: int):
         """从频道分离游戏，并清空频道相关的字段"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    """UPDATE games SET
-                        channel_id = NULL,
-                        main_message_id = NULL,
-                        candidate_custom_input_ids = '[]'
-                       WHERE game_id = ?""",
-                    (game_id,),
-                )
+            await self.conn.execute(
+                """UPDATE games SET
+                    channel_id = NULL,
+                    main_message_id = NULL,
+                    candidate_custom_input_ids = '[]'
+                   WHERE game_id = ?""",
+                (game_id,),
+            )
+            self._invalidate_game_cache()
 
     async def update_game_host(self, game_id: int, new_host_id: str):
         """更新游戏的主持人"""
         if not self.conn:
             raise RuntimeError("数据库未连接")
         async with self.transaction():
-            async with self.conn.cursor() as cursor:
-                await cursor.execute(
-                    "UPDATE games SET host_user_id = ? WHERE game_id = ?",
-                    (new_host_id, game_id),
-                )
+            await self.conn.execute(
+                "UPDATE games SET host_user_id = ? WHERE game_id = ?",
+                (new_host_id, game_id),
+            )
+            self._invalidate_game_cache()
 
     async def get_round_ancestors(self, round_id: int, limit: int = 10) -> list[aiosqlite.Row]:
         """
         获取一个回合及其祖先，按时间正序排列（从最早的祖先到当前回合）。
         
-        使用递归 CTE 一次性查询所有祖先，性能优于逐个查询。
+        借助物化的 parent_path 单次查询所有祖先，无需逐层递归；
+        起始回合缺少 parent_path 时回退到递归 CTE。
         
         Args:
             round_id: 起始回合ID
@@ -789,8 +939,26 @@ class Database:
         await self._ensure_conn_or_raise()
         assert self.conn is not None
         
-        # 使用递归 CTE 一次性获取所有祖先
+        # 依据 parent_path 展开祖先 ID 列表，按主键一次性取回，无需逐层递归
         query = """
+        SELECT r.*
+        FROM rounds s
+        JOIN json_each('[' || replace(s.parent_path, '/', ',') || s.round_id || ']') AS p
+        JOIN rounds r ON r.round_id = p.value
+        WHERE s.round_id = ?
+        ORDER BY p.key DESC
+        LIMIT ?;
+        """
+        
+        async with self.conn.execute(query, (round_id, limit)) as cursor:
+            rows = await cursor.fetchall()
+        if rows:
+            rows.reverse()
+            return list(rows)
+
+        # parent_path 为 NULL 时 json_each 不产生任何行（回填遗漏或祖先链断裂），
+        # 改用递归 CTE 沿 parent_id 逐层查询
+        fallback_query = """
         WITH RECURSIVE ancestors AS (
             SELECT *, 0 as depth 
             FROM rounds 
@@ -805,10 +973,8 @@ class Database:
         )
         SELECT * FROM ancestors ORDER BY depth DESC;
         """
-        
-        async with self.conn.execute(query, (round_id, limit - 1)) as cursor:
-            rows = await cursor.fetchall()
-            return list(rows)
+        async with self.conn.execute(fallback_query, (round_id, limit - 1)) as cursor:
+            return list(await cursor.fetchall())
 
     async def get_child_rounds(self, round_id: int) -> list[aiosqlite.Row]:
         """
@@ -825,3 +991,57 @@ class Database:
         query = "SELECT round_id FROM rounds WHERE parent_id = ? ORDER BY round_id ASC"
         async with self.conn.execute(query, (round_id,)) as cursor:
             return list(await cursor.fetchall())
+
+    async def get_llm_cache(self, cache_key: str):
+        """
+        读取缓存的 LLM 响应。
+        
+        Args:
+            cache_key: 缓存键
+            
+        Returns:
+            aiosqlite.Row | None: 包含 response 和 model_name 的记录，未命中时返回 None
+        """
+        await self._ensure_conn_or_raise()
+        assert self.conn is not None
+        async with self.conn.execute(
+            "SELECT response, model_name FROM llm_cache WHERE cache_key = ?",
+            (cache_key,),
+        ) as cursor:
+            return await cursor.fetchone()
+
+    async def prune_llm_cache(self, ttl_seconds: int, max_rows: int) -> int:
+        """
+        清理 LLM 响应缓存：删除超过保留时间的条目，并只保留最近写入的 max_rows 条。
+        
+        Returns:
+            int: 删除的条目数
+        """
+        if not self.conn:
+            raise RuntimeError("数据库未连接")
+        async with self.transaction():
+            cursor = await self.conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < datetime('now', ?)",
+                (f"-{int(ttl_seconds)} seconds",),
+            )
+            deleted = cursor.rowcount
+            cursor = await self.conn.execute(
+                """
+                DELETE FROM llm_cache WHERE cache_key NOT IN (
+                    SELECT cache_key FROM llm_cache ORDER BY created_at DESC LIMIT ?
+                )
+                """,
+                (max_rows,),
+            )
+            deleted += cursor.rowcount
+        return deleted
+
+    async def set_llm_cache(self, cache_key: str, response: str, model_name: str | None):
+        """写入（或覆盖）一条 LLM 响应缓存"""
+        if not self.conn:
+            raise RuntimeError("数据库未连接")
+        async with self.transaction():
+            await self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, response, model_name) VALUES (?, ?, ?)",
+                (cache_key, response, model_name),
+            )
@@ -1,7 +1,10 @@
-import json
+import asyncio
 import re
 import shlex
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime, timezone
+from functools import lru_cache
 import aiohttp
 
 from ncatbot.core.event import GroupMessageEvent, NoticeEvent, PrivateMessageEvent
@@ -13,14 +16,54 @@ from .db import Database
 from .cache import CacheManager
 from .game_manager import GameManager
 from .renderer import MarkdownRenderer
-from .utils import EMOJI, bytes_to_base64
+from .utils import (
+    EMOJI,
+    EMOJI_STR,
+    add_reactions,
+    json_loads,
+    run_in_background,
+)
 from .content_fetcher import ContentFetcher
 from .commands import CommandHandler
 from .channel_config import ChannelConfigManager
 from .llm_config import LLMConfigManager
+from .constants import (
+    MAX_SCRIPT_FILE_BYTES,
+    MAX_SYSTEM_PROMPT_LENGTH,
+    MEMBER_ROLE_CACHE_SIZE,
+    MEMBER_ROLE_CACHE_TTL,
+)
 
 LOG = get_log(__name__)
 
+# 通过链接提交剧本：/text_file <url>
+_TEXT_FILE_URL_PATTERN = re.compile(r"^/text_file\s+(https?://[^\s]+)$")
+
+# 出现任一字符即视为可能包含 Markdown 语法，需要渲染预览
+_MARKDOWN_MARKERS = ("#", "*", "`", "[", "|", ">")
+
+# 主消息上的选项表情（投票缓存中以字符串作为键）-> 选项字母
+_OPTION_EMOJIS: dict[str, str] = {
+    EMOJI_STR[option]: option for option in ("A", "B", "C", "D", "E", "F", "G")
+}
+
+
+@lru_cache(maxsize=256)
+def _parse_candidate_ids(candidate_ids_json: str) -> tuple[str, ...]:
+    """
+    解析 games.candidate_custom_input_ids。
+
+    游戏行被缓存后同一 JSON 文本会反复出现，按文本缓存解析结果，
+    避免每次表情回应都重新解析；返回不可变元组，修改时需先复制。
+    """
+    return tuple(json_loads(candidate_ids_json))
+
+
+@lru_cache(maxsize=256)
+def _candidate_id_set(candidate_ids_json: str) -> frozenset[str]:
+    """候选消息 ID 集合，用于每次表情回应/撤回时的 O(1) 成员判断"""
+    return frozenset(_parse_candidate_ids(candidate_ids_json))
+
 
 class EventHandler:
     def __init__(
@@ -32,6 +75,7 @@ class EventHandler:
         renderer: MarkdownRenderer,
         content_fetcher: ContentFetcher,
         command_handler: CommandHandler,
+        http_session: aiohttp.ClientSession,
         channel_config: ChannelConfigManager,
         llm_config_manager: LLMConfigManager | None = None
     ):
@@ -44,13 +88,17 @@ class EventHandler:
         self.config = plugin.config
         self.content_fetcher = content_fetcher
         self.command_handler = command_handler
+        self.http_session = http_session
+        # 群成员角色缓存: {(group_id, user_id): (role, timestamp)}，LRU + TTL
+        self._role_cache: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()
         self.channel_config = channel_config
         self.llm_config_manager = llm_config_manager
 
     async def handle_group_message(self, event: GroupMessageEvent):
         """处理群聊消息，包括文件上传启动和自定义输入"""
-        URL_PATTERN = re.compile(r"^/text_file\s+(https?://[^\s]+)$")
-        if (m:=URL_PATTERN.match(event.raw_message)):
+        if event.raw_message.startswith("/text_file") and (
+            m := _TEXT_FILE_URL_PATTERN.match(event.raw_message)
+        ):
             file = File(file="")
             file.url = m.group(1)
             await self._handle_file_upload(event, file)
@@ -154,15 +202,16 @@ class EventHandler:
         """
         try:
             preview = system_prompt[:2000] # 预览前2000字符
-            img: bytes | None = None
-            if self.renderer:
-                img = await self.renderer.render_markdown(preview)
+            image_uri: str | None = None
+            # 纯文本剧本直接以文字预览，省去整条浏览器渲染流程
+            if self.renderer and any(c in preview for c in _MARKDOWN_MARKERS):
+                image_uri = await self.renderer.render_markdown_image_uri(preview)
 
             reply_message_id = None
-            if img:
+            if image_uri:
                 reply_message_id = await self.api.post_group_file(
                     group_id,
-                    image=f"data:image/png;base64,{bytes_to_base64(img)}",
+                    image=image_uri,
                 )
             else:
                 reply_message_id = await self.api.post_group_msg(
@@ -174,14 +223,12 @@ class EventHandler:
             if not reply_message_id:
                 return False, "无法发送预览消息到群聊"
 
-            if self.db and await self.db.is_game_running(group_id):
-                await self.api.set_msg_emoji_like(
-                    reply_message_id, str(EMOJI["COFFEE"])
-                )  # 频道繁忙
-            else:
-                await self.api.set_msg_emoji_like(
-                    reply_message_id, str(EMOJI["CONFIRM"])
-                )  # 确认
+            # 频道繁忙贴咖啡，否则贴确认；仅为界面提示，后台执行
+            status_emoji = EMOJI["COFFEE"] if await self.db.is_game_running(group_id) else EMOJI["CONFIRM"]
+            run_in_background(
+                self.api.set_msg_emoji_like(reply_message_id, str(status_emoji)),
+                f"为预览消息 {reply_message_id} 贴表情",
+            )
 
             await self.cache_manager.add_pending_game(
                 str(reply_message_id),
@@ -190,6 +237,7 @@ class EventHandler:
                     "system_prompt": system_prompt,
                     "message_id": reply_to_msg_id, # origin message (optional)
                     "create_time": datetime.now(timezone.utc),
+                    "status_emoji": status_emoji,  # 预览消息上当前的状态表情
                 },
             )
             return True, "成功发起确认流程"
@@ -200,12 +248,25 @@ class EventHandler:
     async def _handle_file_upload(self, event: GroupMessageEvent, file: File):
         """处理.txt或.md文件上传，作为开启游戏的入口"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(file.url) as response:
-                    if response.status != 200:
-                        await event.reply("无法获取文件内容。", at=False)
+            async with self.http_session.get(file.url) as response:
+                if response.status != 200:
+                    await event.reply("无法获取文件内容。", at=False)
+                    return
+                # 流式读取并限制大小，避免超大文件被整体读入内存
+                if (response.content_length or 0) > MAX_SCRIPT_FILE_BYTES:
+                    await event.reply("文件过大，无法作为剧本。", at=False)
+                    return
+                buf = bytearray()
+                async for chunk in response.content.iter_chunked(8192):
+                    buf += chunk
+                    if len(buf) > MAX_SCRIPT_FILE_BYTES:
+                        await event.reply("文件过大，无法作为剧本。", at=False)
                         return
-                    content = await response.text()
+                content = buf.decode(response.charset or "utf-8", errors="replace")
+
+            if len(content) > MAX_SYSTEM_PROMPT_LENGTH:
+                await event.reply(f"剧本内容过长 (最大 {MAX_SYSTEM_PROMPT_LENGTH} 字符)。", at=False)
+                return
             
             success, error_msg = await self.process_system_prompt(
                 str(event.group_id),
@@ -226,9 +287,6 @@ class EventHandler:
 
     async def _handle_custom_input(self, event: GroupMessageEvent, reply: Reply):
         """处理对主消息的回复，作为自定义输入"""
-        if not self.db or not self.db.conn:
-            return
-
         group_id = str(event.group_id)
         replied_to_id = reply.id
 
@@ -238,24 +296,23 @@ class EventHandler:
 
         # 检查event消息中是否有at段，如果没有，则终止
         at_segments = event.message.filter(At)
-        is_at_self = any(at.qq == str(event.self_id) for at in at_segments)
+        self_id = str(event.self_id)
+        is_at_self = any(at.qq == self_id for at in at_segments)
         if not is_at_self:
             return
 
         game_id = game["game_id"]
-        candidate_ids_json = game["candidate_custom_input_ids"]
 
         custom_input_message_id = str(event.message_id)
         custom_input_content = "".join(
             s.text for s in event.message.filter_text()
         ).strip()
 
-        candidate_ids: list = json.loads(candidate_ids_json)
-        candidate_ids.append(custom_input_message_id)
-
-        await self.db.update_candidate_custom_input_ids(
-            game_id, json.dumps(candidate_ids)
-        )
+        # 在数据库内原子追加，无需读-改-写；主消息已被替换时放弃
+        if not await self.db.append_candidate_custom_input_id(
+            game_id, replied_to_id, custom_input_message_id
+        ):
+            return
 
         # 将内容添加到缓存
         await self.cache_manager.set_custom_input_content(
@@ -265,15 +322,11 @@ class EventHandler:
         LOG.info(f"游戏 {game_id} 收到新的自定义输入: {custom_input_message_id}")
 
         # 为自定义输入添加投票表情
-        for emoji_key in ["YAY", "NAY", "CANCEL"]:
-            try:
-                await self.api.set_msg_emoji_like(
-                    custom_input_message_id, str(EMOJI[emoji_key])
-                )
-            except Exception as e:
-                LOG.warning(
-                    f"为自定义输入 {custom_input_message_id} 贴表情 {EMOJI[emoji_key]} 失败: {e}"
-                )
+        await add_reactions(
+            self.api,
+            custom_input_message_id,
+            [EMOJI["YAY"], EMOJI["NAY"], EMOJI["CANCEL"]],
+        )
 
     async def handle_emoji_reaction(self, event: NoticeEvent):
         """处理表情回应，包括游戏启动、投票、撤回等"""
@@ -283,20 +336,19 @@ class EventHandler:
         ):
             return
 
-        pending_game = await self.cache_manager.get_pending_game(str(event.message_id))
+        message_id_str = str(event.message_id)
+        pending_game = await self.cache_manager.get_pending_game(message_id_str)
         if pending_game:
-            await self._handle_new_game_confirmation(event, pending_game)
+            await self._handle_new_game_confirmation(event, message_id_str, pending_game)
             return
 
         # 检查是否是游戏中的表情回应
         await self._handle_game_reaction(event)
 
     async def _handle_new_game_confirmation(
-        self, event: NoticeEvent, pending_game: dict
+        self, event: NoticeEvent, message_id_str: str, pending_game: dict
     ):
         """处理新游戏创建的表情确认"""
-        message_id_str = str(event.message_id)
-
         # 批量清理所有过期的请求
         timeout_seconds = int(self.config.get("pending_game_timeout", 300))
         expired_ids = await self.cache_manager.cleanup_expired_pending_games(
@@ -315,7 +367,7 @@ class EventHandler:
         group_id = str(event.group_id)
         emoji_id = str(event.emoji_like_id)
 
-        if emoji_id == str(EMOJI["COFFEE"]):  # 频道繁忙
+        if emoji_id == EMOJI_STR["COFFEE"]:  # 频道繁忙
             try:
                 # await self.api.delete_msg(pending_game["message_id"])
                 # await self.api.set_msg_emoji_like(
@@ -336,28 +388,18 @@ class EventHandler:
             finally:
                 await self.cache_manager.remove_pending_game(message_id_str)
 
-        elif emoji_id == str(EMOJI["CONFIRM"]):  # 确认
-            if self.db and await self.db.is_game_running(group_id):
+        elif emoji_id == EMOJI_STR["CONFIRM"]:  # 确认
+            if await self.db.is_game_running(group_id):
                 await self.api.post_group_msg(
                     group_id,
                     " 当前已有正在进行的游戏，无法创建新游戏。",
                     at=event.user_id,
                     reply=message_id_str,
                 )
-                await self.api.set_msg_emoji_like(
-                    message_id_str, str(EMOJI["COFFEE"])
-                )
-                await self.api.set_msg_emoji_like(
-                    message_id_str, str(EMOJI["CONFIRM"]), set=False
-                )
+                self._switch_status_emoji(message_id_str, pending_game, EMOJI["COFFEE"])
                 return
 
-            await self.api.set_msg_emoji_like(
-                message_id_str, str(EMOJI["CONFIRM"])
-            )
-            await self.api.set_msg_emoji_like(
-                message_id_str, str(EMOJI["COFFEE"]), set=False
-            )
+            self._switch_status_emoji(message_id_str, pending_game, EMOJI["CONFIRM"])
             await self.cache_manager.remove_pending_game(message_id_str)
 
             await self.game_manager.start_new_game(
@@ -366,13 +408,34 @@ class EventHandler:
                 system_prompt=pending_game["system_prompt"],
             )
 
+    def _switch_status_emoji(self, message_id: str, pending_game: dict, target_emoji: int):
+        """
+        将预览消息的状态表情切换为 target_emoji，只发出实际需要的表情更新。
+
+        更新仅为界面提示，在后台并发执行。
+        """
+        current_emoji = pending_game.get("status_emoji")
+        requests = []
+        if current_emoji != target_emoji:
+            requests.append(self.api.set_msg_emoji_like(message_id, str(target_emoji)))
+        if current_emoji is None:
+            # 旧数据未记录状态表情，按原逻辑移除另一个
+            other_emoji = EMOJI["COFFEE"] if target_emoji == EMOJI["CONFIRM"] else EMOJI["CONFIRM"]
+            requests.append(self.api.set_msg_emoji_like(message_id, str(other_emoji), set=False))
+        elif current_emoji != target_emoji:
+            requests.append(self.api.set_msg_emoji_like(message_id, str(current_emoji), set=False))
+        pending_game["status_emoji"] = target_emoji
+
+        if requests:
+            run_in_background(
+                asyncio.gather(*requests),
+                f"更新预览消息 {message_id} 的表情",
+            )
+
     async def _handle_admin_main_message_reaction(
         self, game_id: int, group_id: str, main_message_id: str, emoji_id: str
     ):
         """处理管理员/主持人对主消息的表情回应"""
-        if not self.db:
-            return
-
         game = await self.db.get_game_by_game_id(game_id)
         if not game:
             return
@@ -383,9 +446,9 @@ class EventHandler:
             )
             return
 
-        if emoji_id == str(EMOJI["CONFIRM"]):
+        if emoji_id == EMOJI_STR["CONFIRM"]:
             await self._tally_and_advance(game_id, channel_id = group_id)
-        elif emoji_id == str(EMOJI["DENY"]):
+        elif emoji_id == EMOJI_STR["DENY"]:
             _, result_lines = await self._tally_votes(
                 group_id, main_message_id, game["candidate_custom_input_ids"]
             )
@@ -395,47 +458,33 @@ class EventHandler:
                 + "\n由于一位管理员/主持人的反对票，本轮投票并未获通过，将重新开始本轮。",
                 reply=main_message_id,
             )
-            if self.cache_manager:
-                await self.cache_manager.clear_group_vote_cache(group_id)
-            if self.game_manager:
-                await self.game_manager.checkout_head(game_id)
-        elif emoji_id == str(EMOJI["RETRACT"]):
-            if self.game_manager:
-                await self.game_manager.revert_last_round(game_id)
+            await self.cache_manager.clear_group_vote_cache(group_id)
+            await self.game_manager.checkout_head(game_id)
+        elif emoji_id == EMOJI_STR["RETRACT"]:
+            await self.game_manager.revert_last_round(game_id)
 
 
     async def _handle_admin_custom_input_reaction(
         self, game_id: int, group_id: str, message_id: str
     ):
         """处理管理员/主持人撤回自定义输入的行为"""
-        if not self.db:
-            return
         game = await self.db.get_game_by_game_id(game_id)
         if not game:
             return
-        candidate_ids = json.loads(game["candidate_custom_input_ids"])
-        if message_id not in candidate_ids:
+        if message_id not in _candidate_id_set(game["candidate_custom_input_ids"]):
             return
 
-        candidate_ids.remove(message_id)
-        await self.db.update_candidate_custom_input_ids(
-            game_id, json.dumps(candidate_ids)
-        )
+        if not await self.db.remove_candidate_custom_input_id(game_id, message_id):
+            return
         await self.api.post_group_msg(
             group_id, text=" 由于一名管理员/主持人的撤回，该条回复将不会被计入投票", reply=message_id
         )
         # 从缓存中删除
-        if self.cache_manager:
-            await self.cache_manager.remove_vote_item(group_id, message_id)
+        await self.cache_manager.remove_vote_item(group_id, message_id)
 
     async def _handle_game_reaction(self, event: NoticeEvent):
         """处理游戏进行中的表情回应，包括投票、撤回和管理员操作"""
-        if (
-            not self.db
-            or not self.db.conn
-            or not event.message_id
-            or not event.emoji_like_id
-        ):
+        if not event.message_id or not event.emoji_like_id:
             return
 
         group_id = str(event.group_id)
@@ -444,35 +493,31 @@ class EventHandler:
         emoji_id = str(event.emoji_like_id)
 
         # 读取游戏状态并验证（原子操作）
+        # 游戏行由 Database 按频道缓存（无游戏的频道同样缓存为空），
+        # 因此无关群组的表情回应在这里直接返回，不会访问数据库
         game = await self.db.get_game_by_channel_id(group_id)
         if not game:
             return
 
         game_id = game["game_id"]
         main_message_id = str(game["main_message_id"])
-        candidate_ids = json.loads(game["candidate_custom_input_ids"])
+        candidate_ids = _candidate_id_set(game["candidate_custom_input_ids"])
 
         # --- 主动防御：只处理对有效消息的回应 ---
         if message_id != main_message_id and message_id not in candidate_ids:
             return
 
         # 无论是否冻结，先记录投票（避免数据丢失）
-        if self.cache_manager:
-            await self.cache_manager.update_vote(
-                group_id, message_id, emoji_id, user_id, event.is_add or False
-            )
+        await self.cache_manager.update_vote(
+            group_id, message_id, emoji_id, user_id, event.is_add or False
+        )
 
         # 后续仅管理员/主持人的控制动作需要受冻结状态约束
         if game["is_frozen"]:
             return
 
         # 检查是否是管理员或主持人
-        sender_role = None
-        try:
-            member_info = await self.api.get_group_member_info(group_id, user_id)
-            sender_role = member_info.role
-        except Exception as e:
-            LOG.warning(f"获取群 {group_id} 成员 {user_id} 信息失败: {e}")
+        sender_role = await self._get_member_role(group_id, user_id)
 
         is_admin_or_host = await self.command_handler.check_channel_permission(
             user_id, group_id, sender_role
@@ -486,14 +531,41 @@ class EventHandler:
             await self._handle_admin_main_message_reaction(
                 game_id, group_id, main_message_id, emoji_id
             )
-        elif message_id in candidate_ids and emoji_id == str(EMOJI["CANCEL"]):
+        elif message_id in candidate_ids and emoji_id == EMOJI_STR["CANCEL"]:
             await self._handle_admin_custom_input_reaction(
                 game_id, group_id, message_id
             )
 
+    async def _get_member_role(self, group_id: str, user_id: str) -> str | None:
+        """获取群成员角色，短时间内复用缓存以避免每次表情回应都请求接口"""
+        key = (group_id, user_id)
+        cached = self._role_cache.get(key)
+        now = time.monotonic()
+        if cached and now - cached[1] < MEMBER_ROLE_CACHE_TTL:
+            self._role_cache.move_to_end(key)
+            return cached[0]
+
+        try:
+            member_info = await self.api.get_group_member_info(group_id, user_id)
+        except Exception as e:
+            LOG.warning(f"获取群 {group_id} 成员 {user_id} 信息失败: {e}")
+            return None
+
+        self._role_cache[key] = (member_info.role, now)
+        self._role_cache.move_to_end(key)
+        while len(self._role_cache) > MEMBER_ROLE_CACHE_SIZE:
+            self._role_cache.popitem(last=False)
+        return member_info.role
+
+    async def handle_admin_change(self, event: NoticeEvent):
+        """群管理员变动时使对应成员的角色缓存失效"""
+        if event.notice_type != "group_admin":
+            return
+        self._role_cache.pop((str(event.group_id), str(event.user_id)), None)
+
     async def handle_message_retraction(self, event: NoticeEvent):
         """处理消息撤回通知，如果撤回的是候选自定义输入，则自动移除"""
-        if event.notice_type != "group_recall" or not self.db:
+        if event.notice_type != "group_recall":
             return
 
         group_id = str(event.group_id)
@@ -503,60 +575,62 @@ class EventHandler:
         if not game:
             return
 
-        candidate_ids = json.loads(game["candidate_custom_input_ids"])
-        if message_id not in candidate_ids:
+        if message_id not in _candidate_id_set(game["candidate_custom_input_ids"]):
             return
 
         # 找到了匹配的候选输入，执行移除逻辑
         LOG.info(f"检测到候选回复 {message_id} 被撤回，将自动移除。")
-        candidate_ids.remove(message_id)
-        await self.db.update_candidate_custom_input_ids(
-            game["game_id"], json.dumps(candidate_ids)
-        )
+        if not await self.db.remove_candidate_custom_input_id(game["game_id"], message_id):
+            return
         await self.api.post_group_msg(
             group_id, text="一条候选回复已被作者撤回，将不计入投票。", reply=game["main_message_id"]
         )
-        if self.cache_manager:
-            await self.cache_manager.remove_vote_item(group_id, message_id)
+        await self.cache_manager.remove_vote_item(group_id, message_id)
 
     async def _tally_votes(
         self, group_id: str, main_message_id: str, candidate_ids_json: str
     ) -> tuple[dict[str, int], list[str]]:
         """计票并返回分数和结果文本"""
-        scores: dict[str, int] = {}
         result_lines = ["🗳️ 投票结果统计："]
 
         group_vote_cache = await self.cache_manager.get_group_vote_cache(group_id)
 
-        option_emojis = {
-            EMOJI["A"]: "A",
-            EMOJI["B"]: "B",
-            EMOJI["C"]: "C",
-            EMOJI["D"]: "D",
-            EMOJI["E"]: "E",
-            EMOJI["F"]: "F",
-            EMOJI["G"]: "G",
-        }
         main_votes_cache = group_vote_cache.get(main_message_id, {}).get("votes", {})
-        for emoji, option in option_emojis.items():
-            count = len(main_votes_cache.get(str(emoji), set()))
-            if count > 0:
-                scores[option] = count
-                result_lines.append(f"- 选项 {option}: {count} 票")
-
-        candidate_ids = json.loads(candidate_ids_json)
+        scores: Counter[str] = Counter(
+            {
+                option: len(main_votes_cache[emoji])
+                for emoji, option in _OPTION_EMOJIS.items()
+                if main_votes_cache.get(emoji)
+            }
+        )
+        for option, count in scores.items():
+            result_lines.append(f"- 选项 {option}: {count} 票")
+
+        candidate_ids = _parse_candidate_ids(candidate_ids_json)
+        # 内容在收到自定义输入时已写入投票缓存，直接取用刚拿到的快照；
+        # 仅对缺失内容的候选一次性并发回源，避免逐条串行请求
+        contents = {
+            cid: group_vote_cache[cid]["content"]
+            for cid in candidate_ids
+            if group_vote_cache.get(cid, {}).get("content")
+        }
+        missing_ids = [cid for cid in candidate_ids if cid not in contents]
+        if missing_ids:
+            contents.update(
+                await self.content_fetcher.get_custom_input_contents(group_id, missing_ids)
+            )
         for cid in candidate_ids:
             item_cache = group_vote_cache.get(cid, {})
             input_votes = item_cache.get("votes", {})
-            yay = len(input_votes.get(str(EMOJI["YAY"]), set()))
-            nay = len(input_votes.get(str(EMOJI["NAY"]), set()))
+            yay = len(input_votes.get(EMOJI_STR["YAY"], ()))
+            nay = len(input_votes.get(EMOJI_STR["NAY"], ()))
             net_score = yay - nay
 
             # 只有在有人投票时才计入 scores，以供后续逻辑判断
             if yay > 0 or nay > 0:
                 scores[cid] = net_score
 
-            content = await self.content_fetcher.get_custom_input_content(group_id, cid)
+            content = contents[cid]
             display_content = f'"{content}"' if "ID:" not in content else content
             result_lines.append(f"- {display_content}: {net_score} 票")
 
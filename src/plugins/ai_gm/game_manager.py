@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 import json
 import time
 from typing import cast, TYPE_CHECKING
@@ -7,7 +9,7 @@ from ncatbot.plugin_system import NcatBotPlugin
 from .db import Database
 from .llm_api import LLM_API, ChatCompletionMessageParam
 from .renderer import MarkdownRenderer
-from .utils import EMOJI, bytes_to_base64
+from .utils import EMOJI, add_reactions, config_flag, run_in_background
 from .cache import CacheManager
 from .content_fetcher import ContentFetcher
 from .exceptions import TipChangedError, GameFrozenError
@@ -20,6 +22,19 @@ if TYPE_CHECKING:
 
 LOG = get_log(__name__)
 
+# 主消息上的投票选项与管理员操作表情，按贴出顺序排列
+_MAIN_MESSAGE_EMOJIS: tuple[int, ...] = tuple(
+    EMOJI[name] for name in ("A", "B", "C", "D", "E", "F", "G", "CONFIRM", "DENY", "RETRACT")
+)
+
+_OPTION_LETTERS = frozenset("ABCDEFG")
+
+
+def _select_winners(scores: dict[str, int]) -> list[str]:
+    """返回得分最高的全部选项/自定义输入（保持计票顺序），scores 不能为空"""
+    max_score = max(scores.values())
+    return [k for k, v in scores.items() if v == max_score]
+
 
 class GameManager:
     def __init__(
@@ -47,6 +62,9 @@ class GameManager:
         self._history_cache: OrderedDict[str, tuple[list[ChatCompletionMessageParam], float]] = OrderedDict()
         self._cache_ttl = 300  # 5分钟缓存
         self._max_cache_size = 100  # 最大缓存项数
+        # LLM 响应缓存命中统计
+        self.llm_cache_hits = 0
+        self.llm_cache_misses = 0
 
     async def _get_llm_preset(self, group_id: str) -> tuple[LLMPreset | None, BindingInfo | None, str | None]:
         """
@@ -82,7 +100,51 @@ class GameManager:
     ) -> tuple[str | None, dict | None, str | None]:
         """
         尝试获取 LLM 响应，如果失败且存在不同的 Fallback，则尝试 Fallback。
+
+        开启 llm_response_cache 配置后，相同模型与上下文的请求直接复用已缓存的响应。
         """
+        if not config_flag(self.plugin.config, "llm_response_cache"):
+            return await self._request_completion(messages, channel_id, initial_preset, initial_binding)
+
+        cache_key = hashlib.sha256(
+            json.dumps(
+                {"model": initial_preset["model"], "messages": messages},
+                sort_keys=True,
+                ensure_ascii=False,
+            ).encode("utf-8")
+        ).hexdigest()
+        try:
+            cached = await self.db.get_llm_cache(cache_key)
+        except Exception as e:
+            LOG.warning(f"读取 LLM 响应缓存失败: {e}")
+            cached = None
+        if cached:
+            self.llm_cache_hits += 1
+            LOG.debug(f"LLM 响应缓存命中 (hits={self.llm_cache_hits}, misses={self.llm_cache_misses})")
+            # 命中缓存未产生新的用量，usage 置空以免重复计费
+            return cached["response"], None, cached["model_name"]
+
+        self.llm_cache_misses += 1
+        content, usage, model_name = await self._request_completion(
+            messages, channel_id, initial_preset, initial_binding
+        )
+        # 缓存键使用主力预设的模型；Fallback 模型给出的响应不写入，
+        # 以免主力模型恢复后仍复用保底模型的结果
+        if content and model_name == initial_preset["model"]:
+            try:
+                await self.db.set_llm_cache(cache_key, content, model_name)
+            except Exception as e:
+                LOG.warning(f"写入 LLM 响应缓存失败: {e}")
+        return content, usage, model_name
+
+    async def _request_completion(
+        self,
+        messages: list[ChatCompletionMessageParam],
+        channel_id: str,
+        initial_preset: LLMPreset,
+        initial_binding: BindingInfo
+    ) -> tuple[str | None, dict | None, str | None]:
+        """实际调用 LLM API，失败时按需切换到 Fallback 预设"""
         # 1. 尝试使用初始预设
         try:
             return await self.llm_api.get_completion(messages, preset=initial_preset)
@@ -127,12 +189,6 @@ class GameManager:
             user_id: 游戏的发起者（主持人）ID。
             system_prompt: 游戏的系统提示词。
         """
-        if not self.db or not self.db.conn or not self.llm_api:
-            await self.api.post_group_msg(
-                group_id, text="❌ 插件未完全初始化，无法开始游戏。"
-            )
-            return
-
         # 0. 检查 LLM 绑定
         preset, binding, error = await self._get_llm_preset(group_id)
         if not preset or not binding:
@@ -155,45 +211,56 @@ class GameManager:
 
         game_id = None
         try:
-            # 1. 在数据库中创建游戏记录
-            game_id = await self.db.create_game(group_id, user_id, system_prompt)
-            LOG.info(f"群 {group_id} 创建了新游戏，ID: {game_id}")
-
-            # 3. 检查是否启用高级模式
+            # 1. 检查是否启用高级模式
             is_advanced_mode = False
             if self.channel_config:
                 is_advanced_mode = await self.channel_config.is_advanced_mode_enabled(str(group_id))
 
-            # 2. 调用 LLM 获取开场白
-            provider_msg = f"\n⚡️ 算力提供: {owner_id} (Model: {preset['model']})"
-            await self.api.post_group_msg(
-                group_id, text=f"🚀 新游戏即将开始... 正在联系 GM 生成开场白...{provider_msg}"
-            )
-            
             initial_messages: list[ChatCompletionMessageParam] = [
                 {"role": "system", "content": (NSFW_PROMPT if is_advanced_mode else "") + system_prompt},
                 {"role": "user", "content": "开始"},
             ]
-            
-            assistant_response, usage, model_name = await self._get_completion_with_fallback(
-                initial_messages, group_id, preset, binding
-            )
+
+            async def create_game_record():
+                # 游戏记录创建成功后再发送开场提示，避免数据库失败时留下孤立的提示消息
+                nonlocal game_id
+                game_id = await self.db.create_game(group_id, user_id, system_prompt)
+                LOG.info(f"群 {group_id} 创建了新游戏，ID: {game_id}")
+                provider_msg = f"\n⚡️ 算力提供: {owner_id} (Model: {preset['model']})"
+                await self.api.post_group_msg(
+                    group_id, text=f"🚀 新游戏即将开始... 正在联系 GM 生成开场白...{provider_msg}"
+                )
+
+            # 2. 调用 LLM 获取开场白，同时在数据库中创建游戏记录（两者互不依赖）；
+            # 任一任务失败时 TaskGroup 会取消另一个，已创建的游戏记录由下方统一清理
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(create_game_record())
+                    llm_task = tg.create_task(
+                        self._get_completion_with_fallback(initial_messages, group_id, preset, binding)
+                    )
+            except ExceptionGroup as eg:
+                raise eg.exceptions[0]
+
+            assert game_id is not None
+            assistant_response, usage, model_name = llm_task.result()
 
             if not assistant_response:
                 raise Exception("LLM 未能生成开场白。")
 
-            # 3. 创建 Round 和 Branch
-            round_id = await self.db.create_round(
-                game_id,
-                -1,
-                "开始",
-                assistant_response,
-                llm_usage=json.dumps(usage) if usage else None,
-                model_name=model_name,
-            )
-            branch_id = await self.db.create_branch(game_id, "main", round_id)
+            # 3. 在同一事务内创建 Round、Branch 并设置 HEAD，只提交一次
+            async with self.db.transaction():
+                round_id = await self.db.create_round(
+                    game_id,
+                    -1,
+                    "开始",
+                    assistant_response,
+                    llm_usage=json.dumps(usage) if usage else None,
+                    model_name=model_name,
+                )
+                branch_id = await self.db.create_branch(game_id, "main", round_id)
 
-            await self.db.update_game_head_branch(game_id, branch_id)
+                await self.db.update_game_head_branch(game_id, branch_id)
 
             LOG.info(f"游戏 {game_id} 的初始 round 和 branch 已创建")
 
@@ -218,10 +285,6 @@ class GameManager:
         Args:
             game_id: 要检出的游戏ID。
         """
-        if not self.db or not self.db.conn or not self.cache_manager:
-            LOG.error("检出 head 失败：组件未初始化。")
-            return
-
         channel_id = None
         try:
             # 1. 获取游戏和 head 分支信息
@@ -292,18 +355,15 @@ class GameManager:
 
             else:
                 # 4b. 普通模式：渲染并发送图片
-                if not self.renderer:
-                    raise Exception("渲染器未初始化。")
-
-                image_bytes = await self.renderer.render_markdown(
+                image_uri = await self.renderer.render_markdown_image_uri(
                     assistant_response, extra_text=extra_text
                 )
-                if not image_bytes:
+                if not image_uri:
                     raise Exception("渲染剧情图片失败。")
 
                 main_message_id = await self.api.post_group_file(
                     channel_id,
-                    image=f"data:image/png;base64,{bytes_to_base64(image_bytes)}",
+                    image=image_uri,
                 )
                 if not main_message_id:
                     raise Exception("发送剧情图片失败。")
@@ -312,25 +372,11 @@ class GameManager:
             await self.db.update_game_main_message(game_id, main_message_id)
 
             # 6. 添加表情回应
-            emoji_list = [
-                EMOJI["A"],
-                EMOJI["B"],
-                EMOJI["C"],
-                EMOJI["D"],
-                EMOJI["E"],
-                EMOJI["F"],
-                EMOJI["G"],
-                EMOJI["CONFIRM"],
-                EMOJI["DENY"],
-                EMOJI["RETRACT"],
-            ]
-            for emoji_id in emoji_list:
-                try:
-                    await self.api.set_msg_emoji_like(
-                        main_message_id, str(emoji_id)
-                    )
-                except Exception as e:
-                    LOG.warning(f"为消息 {main_message_id} 贴表情 {emoji_id} 失败: {e}")
+            # 贴表情不影响游戏状态，放到后台执行，尽早结束检出流程
+            run_in_background(
+                add_reactions(self.api, main_message_id, _MAIN_MESSAGE_EMOJIS),
+                f"为主消息 {main_message_id} 贴表情",
+            )
 
             mode_text = "高级模式(链接)" if is_advanced_mode else "普通模式(图片)"
             LOG.info(f"游戏 {game_id} 已成功检出 head ({mode_text})，主消息 ID: {main_message_id}")
@@ -348,7 +394,7 @@ class GameManager:
         """
         从数据库构建用于 LLM 的对话历史。
         
-        使用递归 CTE 一次性获取所有祖先回合，避免 N+1 查询问题。
+        通过 get_round_ancestors 单次查询获取全部祖先回合，避免逐轮回溯的 N+1 查询。
         引入内存缓存减少数据库压力，并使用 LRU 策略管理缓存大小。
         
         Args:
@@ -356,11 +402,8 @@ class GameManager:
             tip_round_id: 当前回合ID
             
         Returns:
-            完整的对话历史列表，如果失败则返回 None
+            完整的对话历史列表，如果失败则返回 None。返回的列表为缓存共享对象，调用方不得修改
         """
-        if not self.db:
-            return None
-        
         cache_key = f"{tip_round_id}:{hash(system_prompt)}:{nsfw_mode}"
         current_time = time.time()
         
@@ -411,9 +454,6 @@ class GameManager:
             scores: 包含各选项得分的字典
             result_lines: 用于向用户展示的投票结果文本行
         """
-        if not self.db or not self.db.conn or not self.llm_api:
-            return
-
         channel_id = None
         main_message_id = None
         system_prompt = None
@@ -423,7 +463,8 @@ class GameManager:
         try:
             # 1. 在事务内立即检查冻结状态并设置冻结（原子操作）
             async with self.db.transaction():
-                game_data = await self.db.get_game_by_game_id(game_id)
+                # 游戏信息与 HEAD 分支的 tip 一次查询取回
+                game_data = await self.db.get_game_with_head_tip(game_id)
                 if not game_data:
                     return
                 
@@ -440,11 +481,10 @@ class GameManager:
                 system_prompt = game_data["system_prompt"]
                 head_branch_id = game_data["head_branch_id"]
                 
-                # 获取并锁定当前分支的 tip_round_id
-                branch = await self.db.get_branch_by_id(head_branch_id)
-                if not branch:
+                # 记录当前分支的 tip_round_id，作为新回合的父节点和之后乐观锁校验的基准
+                initial_tip_round_id = game_data["tip_round_id"]
+                if initial_tip_round_id is None:
                     raise RuntimeError("找不到 HEAD 分支")
-                initial_tip_round_id = branch["tip_round_id"]
 
             # 2. 检查投票结果
             if not scores:
@@ -455,17 +495,15 @@ class GameManager:
                 )
                 return
 
-            # 3. 找出胜利者
-            max_score = max(scores.values())
-            winners = [k for k, v in scores.items() if v == max_score]
-            winner_lines = []
-            for x in winners:
-                if x in "ABCDEFG":
-                    winner_lines.append(f"选择选项 {x}")
-                else:
-                    content = await self.content_fetcher.get_custom_input_content(channel_id, x)
-                    winner_lines.append(content)
-            winner_content = "\n".join(winner_lines)
+            # 3. 找出胜利者（并列时全部采纳），自定义输入的内容一次性并发获取
+            winners = _select_winners(scores)
+            custom_contents = await self.content_fetcher.get_custom_input_contents(
+                channel_id, [x for x in winners if x not in _OPTION_LETTERS]
+            )
+            winner_content = "\n".join(
+                f"选择选项 {x}" if x in _OPTION_LETTERS else custom_contents[x]
+                for x in winners
+            )
 
             await self.api.post_group_msg(
                 channel_id,
@@ -474,11 +512,15 @@ class GameManager:
             )
 
             # 4. 构建历史
-            messages = await self._build_llm_history(system_prompt, initial_tip_round_id, nsfw_mode)
-            if not messages:
+            history = await self._build_llm_history(system_prompt, initial_tip_round_id, nsfw_mode)
+            if not history:
                 await self.api.post_group_msg(channel_id, text="构建对话历史失败，游戏中断。")
                 return
-            messages.append({"role": "user", "content": winner_content})
+            # 历史列表来自缓存，复制后再追加本轮输入，避免污染缓存
+            messages: list[ChatCompletionMessageParam] = [
+                *history,
+                {"role": "user", "content": winner_content},
+            ]
 
             # 5. 获取 LLM Preset
             preset, binding, error = await self._get_llm_preset(channel_id)
@@ -521,21 +563,14 @@ class GameManager:
                     raise TipChangedError("分支状态在处理期间被修改")
 
                 # 创建新回合
-                async with self.db.conn.cursor() as cursor:
-                    await cursor.execute(
-                        "INSERT INTO rounds (game_id, parent_id, player_choice, assistant_response, llm_usage, model_name) VALUES (?, ?, ?, ?, ?, ?)",
-                        (
-                            game_id,
-                            initial_tip_round_id,
-                            winner_content,
-                            new_assistant_response,
-                            json.dumps(usage) if usage else None,
-                            model_name,
-                        ),
-                    )
-                    new_round_id = cursor.lastrowid
-                    if new_round_id is None:
-                        raise RuntimeError("创建新回合失败")
+                new_round_id = await self.db.create_round(
+                    game_id,
+                    initial_tip_round_id,
+                    winner_content,
+                    new_assistant_response,
+                    json.dumps(usage) if usage else None,
+                    model_name,
+                )
 
                 # 更新分支 tip
                 await self.db.update_branch_tip(head_branch_id, new_round_id)
@@ -568,12 +603,11 @@ class GameManager:
                 await self.api.post_group_msg(channel_id, text=f"❌ 推进失败: {e}")
         finally:
             # 确保游戏最终被解冻
-            if self.db:
-                try:
-                    await self.db.set_game_frozen_status(game_id, False)
-                    LOG.debug(f"游戏 {game_id} 已解冻")
-                except Exception as e:
-                    LOG.error(f"解冻游戏 {game_id} 失败: {e}", exc_info=True)
+            try:
+                await self.db.set_game_frozen_status(game_id, False)
+                LOG.debug(f"游戏 {game_id} 已解冻")
+            except Exception as e:
+                LOG.error(f"解冻游戏 {game_id} 失败: {e}", exc_info=True)
 
     async def revert_last_round(self, game_id: int):
         """
@@ -582,49 +616,36 @@ class GameManager:
         Args:
             game_id: 游戏ID。
         """
-        if not self.db or not self.db.conn:
-            return
-
         channel_id = None
         try:
             game_info = await self.db.get_game_and_head_branch_info(game_id)
             if not game_info:
                 raise Exception("找不到游戏或其 head 分支。")
 
-            channel_id, tip_round_id = (
+            # tip 回合的父节点随游戏信息一次查询取回
+            channel_id, head_branch_id, parent_id = (
                 game_info["channel_id"],
-                game_info["tip_round_id"],
+                game_info["head_branch_id"],
+                game_info["tip_parent_id"],
             )
-
-            round_info = await self.db.get_round_info(tip_round_id)
-            if not round_info:
+            if parent_id is None:
                 raise Exception("找不到当前回合信息。")
 
-            parent_id = round_info["parent_id"]
-
+            channel_id = str(channel_id)
             if parent_id == -1:
                 await self.api.post_group_msg(
-                    str(channel_id), text="已经是第一轮了，无法再回退。"
+                    channel_id, text="已经是第一轮了，无法再回退。"
                 )
                 return
 
-            async with self.db.conn.cursor() as cursor:
-                await cursor.execute(
-                    "SELECT head_branch_id FROM games WHERE game_id = ?", (game_id,)
-                )
-                head_branch_id_tuple = await cursor.fetchone()
-                if not head_branch_id_tuple:
-                    raise Exception("找不到游戏的 head_branch_id")
-                head_branch_id = head_branch_id_tuple[0]
-                await self.db.update_branch_tip(head_branch_id, parent_id)
+            await self.db.update_branch_tip(head_branch_id, parent_id)
 
             LOG.info(f"游戏 {game_id} 已成功回退到 round {parent_id}")
             await self.api.post_group_msg(
-                str(channel_id), text="🔄 游戏已成功回退到上一轮。"
+                channel_id, text="🔄 游戏已成功回退到上一轮。"
             )
 
-            if self.cache_manager:
-                await self.cache_manager.clear_group_vote_cache(str(channel_id))
+            await self.cache_manager.clear_group_vote_cache(channel_id)
 
             # 5. 刷新游戏界面
             await self.checkout_head(game_id)
@@ -648,8 +669,6 @@ class GameManager:
         Raises:
             ValueError: 如果游戏或目标回合不存在。
         """
-        if not self.db:
-            return
         channel_id = None
         try:
             game = await self.db.get_game_by_game_id(game_id)
@@ -689,8 +708,6 @@ class GameManager:
         Raises:
             ValueError: 如果游戏或分支不存在。
         """
-        if not self.db:
-            return
         channel_id = None
         try:
             game = await self.db.get_game_by_game_id(game_id)
@@ -727,8 +744,6 @@ class GameManager:
         Raises:
             ValueError: 如果游戏或目标回合不存在。
         """
-        if not self.db:
-            return
         channel_id = None
         try:
             game = await self.db.get_game_by_game_id(game_id)
@@ -8,6 +8,7 @@ from ncatbot.core.event import GroupMessageEvent, NoticeEvent, PrivateMessageEve
 from ncatbot.core.event.message_segment import At
 from ncatbot.utils import get_log
 from pathlib import Path
+import aiohttp
 
 from .db import Database
 from .llm_api import LLM_API
@@ -21,6 +22,15 @@ from .visualizer import Visualizer
 from .web_ui import WebUI
 from .channel_config import ChannelConfigManager
 from .llm_config import LLMConfigManager
+from .utils import config_flag
+from .constants import (
+    CACHE_SWEEP_INTERVAL_SECONDS,
+    HTTP_CONNECTION_LIMIT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    LLM_CACHE_MAX_ROWS,
+    LLM_CACHE_TTL_SECONDS,
+)
 import asyncio
 
 LOG = get_log(__name__)
@@ -45,6 +55,7 @@ class AIGMPlugin(NcatBotPlugin):
         self.web_ui: WebUI | None = None
         self.channel_config: ChannelConfigManager | None = None
         self.llm_config_manager: LLMConfigManager | None = None
+        self._http: aiohttp.ClientSession | None = None
         self.data_path: Path = Path()
 
     async def on_load(self):
@@ -59,6 +70,8 @@ class AIGMPlugin(NcatBotPlugin):
         self.register_config("openai_max_pool_size", 20, "LLM API 连接池最大大小")
         self.register_config("openai_client_idle_timeout", 3600.0, "LLM API 客户端空闲超时（秒）")
         self.register_config("pending_game_timeout", 300, "新游戏等待确认的超时时间（秒）")
+        self.register_config("llm_response_cache", False, "是否复用相同模型与上下文的 LLM 响应（开启后重投同一局面将得到相同结果）")
+        self.register_config("render_file_uri", False, "以 file:// 路径发送渲染图片，省去 base64 编码（仅当 OneBot 实现与插件共享文件系统时开启）")
         # TODO: 实现并发渲染限制机制
         self.register_config("max_concurrent_renders", 3, "最大并发渲染数量（预留配置）")
         LOG.debug(f"[{self.name}] 配置项注册完毕。")
@@ -67,10 +80,13 @@ class AIGMPlugin(NcatBotPlugin):
         data_dir = self.data_path / "data" / "AIGMPlugin"
         data_dir.mkdir(parents=True, exist_ok=True)
         db_path = data_dir / "ai_gm.db"
-        cache_path = data_dir / "cache.json"
+        cache_dir = data_dir / "cache"
 
-        self.db = Database(str(db_path))
+        # 插件实例是 games 表的唯一写入者，可安全缓存频道对应的游戏行
+        self.db = Database(str(db_path), cache_games=True)
         await self.db.connect()
+        # 之后的组件均假定数据库已连接，不再逐处判空；断线由 Database 自行重连
+        assert self.db.conn is not None
         LOG.debug(f"[{self.name}] 数据库连接成功。")
 
         # 3. 初始化配置管理器
@@ -102,11 +118,23 @@ class AIGMPlugin(NcatBotPlugin):
             LOG.error(f"LLM API 初始化失败: {e}")
 
         # 5. 初始化渲染器
-        self.renderer = MarkdownRenderer()
+        self.renderer = MarkdownRenderer(
+            cache_dir=data_dir / "render_cache",
+            file_uri=config_flag(self.config, "render_file_uri"),
+        )
         LOG.debug(f"[{self.name}] Markdown渲染器初始化完成。")
 
+        # 共享 HTTP 会话，复用连接（文件下载等）
+        self._http = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=HTTP_CONNECTION_LIMIT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+        )
+
         # 6. 初始化管理器
-        self.cache_manager = CacheManager(cache_path)
+        self.cache_manager = CacheManager(cache_dir)
         await self.cache_manager.load_from_disk()
 
         # 启动定期清理任务
@@ -172,6 +200,7 @@ class AIGMPlugin(NcatBotPlugin):
                 self.renderer,
                 content_fetcher,
                 self.command_handler,
+                self._http,
                 channel_config=self.channel_config,
                 llm_config_manager=self.llm_config_manager,
             )
@@ -185,20 +214,28 @@ class AIGMPlugin(NcatBotPlugin):
         if not self.cache_manager:
             return
 
-        async def _cleanup_tokens():
+        async def _sweep_caches():
+            # 待确认游戏原本只在同一消息再次收到表情时才清理，被放弃的请求与
+            # 已结束游戏的投票会一直留在内存中，因此在后台按时间统一清理
             while True:
                 try:
-                    await asyncio.sleep(600)  # 每10分钟
+                    await asyncio.sleep(CACHE_SWEEP_INTERVAL_SECONDS)
                     if self.cache_manager:
+                        timeout_seconds = int(self.config.get("pending_game_timeout", 300))
+                        await self.cache_manager.cleanup_expired_pending_games(timeout_seconds)
+                        await self.cache_manager.cleanup_expired_votes()
                         await self.cache_manager.cleanup_expired_web_tokens()
+                    if self.db and config_flag(self.config, "llm_response_cache"):
+                        # LLM 响应缓存每回合新增一条，需按时间与条数清理
+                        await self.db.prune_llm_cache(LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ROWS)
                 except asyncio.CancelledError:
                     break
                 except Exception as e:
-                    LOG.error(f"清理过期 Token 失败: {e}", exc_info=True)
+                    LOG.error(f"定期清理缓存失败: {e}", exc_info=True)
                     await asyncio.sleep(60) # 出错后等待1分钟再重试
 
-        self._cleanup_task = asyncio.create_task(_cleanup_tokens())
-        LOG.info("已启动 Token 定期清理任务")
+        self._cleanup_task = asyncio.create_task(_sweep_caches())
+        LOG.info("已启动缓存定期清理任务")
 
     async def _safe_shutdown(self, coro, name: str, timeout: float = 5.0):
         """辅助方法：带超时保护的安全关闭"""
@@ -258,8 +295,16 @@ class AIGMPlugin(NcatBotPlugin):
                 "数据库",
                 timeout=3.0
             )
+
+        # 5. 关闭共享 HTTP 会话
+        if self._http:
+            await self._safe_shutdown(
+                self._http.close(),
+                "HTTP 会话",
+                timeout=3.0
+            )
             
-        # # 5. 关闭渲染器（带超时保护）
+        # # 6. 关闭渲染器（带超时保护）
         # if self.renderer:
         #     await self._safe_shutdown(
         #         self.renderer.close(),
@@ -289,6 +334,11 @@ class AIGMPlugin(NcatBotPlugin):
         if self.event_handler:
             await self.event_handler.handle_message_retraction(event)
 
+    @on_notice
+    async def handle_admin_change(self, event: NoticeEvent):
+        if self.event_handler:
+            await self.event_handler.handle_admin_change(event)
+
     aigm_group = command_registry.group("aigm", description="AI GM 游戏插件命令")
 
     @aigm_group.command("", aliases=["help"], description="显示帮助信息")  # 默认命令
@@ -2,11 +2,20 @@ from markdown_it import MarkdownIt
 from playwright.async_api import async_playwright
 from ncatbot.utils import get_log
 import asyncio
+import aiofiles
+import hashlib
+import os
 import re
+from collections import OrderedDict
 from pathlib import Path
 
+from .utils import image_data_uri
 from .constants import (
     MAX_CONCURRENT_RENDERS,
+    RENDER_CACHE_SIZE,
+    RENDER_DISK_CACHE_SIZE,
+    RENDER_IMAGE_FORMAT,
+    RENDER_JPEG_QUALITY,
     RENDER_WIDTH,
     RENDER_PADDING,
     RENDER_TOP_PADDING,
@@ -17,6 +26,196 @@ from .constants import (
 
 LOG = get_log(__name__)
 
+# Markdown 渲染的截图参数与磁盘缓存文件后缀
+_SCREENSHOT_OPTIONS: dict = (
+    {"type": "jpeg", "quality": RENDER_JPEG_QUALITY}
+    if RENDER_IMAGE_FORMAT == "jpeg"
+    else {"type": "png"}
+)
+_RENDER_SUFFIX = ".jpg" if RENDER_IMAGE_FORMAT == "jpeg" else ".png"
+
+# 仅用于离屏截图的 Chromium 启动参数：关闭 GPU、扩展与后台网络等，缩短冷启动并降低内存占用
+_BROWSER_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--mute-audio",
+]
+# 渲染页面的样式全部内联，外部图片、字体与媒体请求直接拒绝
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
+
+async def _block_external_resources(route):
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+# 手工拼接进 HTML 的文本用 str.translate 单次转义
+_HTML_ESCAPE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+
+# Markdown 页面的文档头与样式只依赖常量，模块加载时拼好一次，渲染时只拼接正文
+_MARKDOWN_PAGE_HEAD = f"""\
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        :root {{
+            --bg-color: #121212;
+            --text-color: #e0e0e0;
+            --primary-color: #bb86fc;
+            --secondary-color: #03dac6;
+            --surface-color: #1e1e1e;
+            --border-color: #333;
+        }}
+
+        body {{
+            position: relative;
+            /* 最终渲染宽度 */
+            width: {RENDER_WIDTH}px;
+            box-sizing: border-box;
+
+            /* 背景色 */
+            background-color: var(--bg-color);
+            color: var(--text-color);
+
+            /* 内边距 */
+            padding: {RENDER_PADDING}px;
+            padding-top: {RENDER_TOP_PADDING}px;
+
+            /* 字体 */
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif;
+
+            /* 基础字号 */
+            font-size: {BASE_FONT_SIZE}px;
+            line-height: 1.6;
+            letter-spacing: 0.1em;
+            margin: 0 auto;
+
+            word-break: break-all;
+            word-wrap: break-word;
+        }}
+
+        .header-info {{
+            position: absolute;
+            top: 40px;
+            left: {RENDER_PADDING}px;
+            right: {RENDER_PADDING}px;
+            display: flex;
+            justify-content: space-between;
+            font-size: {HEADER_FONT_SIZE}px;
+            color: #888;
+        }}
+
+        /* 移植自 base.html 的样式 */
+        h1, h2, h3, h4, h5, h6 {{
+            color: var(--primary-color);
+            margin-top: 1.5rem;
+            margin-bottom: 1rem;
+            font-weight: 600;
+            line-height: 1.25;
+        }}
+        h1 {{ font-size: 1.8em; }}
+        h2 {{ font-size: 1.5em; }}
+        h3 {{ font-size: 1.3em; }}
+        h4 {{ font-size: 1.1em; }}
+
+        p {{
+            margin-bottom: 1rem;
+        }}
+
+        a {{
+            color: var(--secondary-color);
+            text-decoration: none;
+        }}
+        a:hover {{
+            text-decoration: underline;
+        }}
+
+        ul, ol {{
+            margin-bottom: 1rem;
+            padding-left: 2em;
+        }}
+        li {{
+            margin-bottom: 0.5rem;
+        }}
+
+        blockquote {{
+            border-left: 0.2em solid var(--primary-color);
+            padding-left: 1em;
+            margin: 1rem 0;
+            font-style: italic;
+            color: #b0b0b0;
+            background-color: rgba(187, 134, 252, 0.05);
+            padding: 0.5em 1em;
+            border-radius: 0 8px 8px 0;
+        }}
+
+        code {{
+            background-color: #333;
+            color: #f8f8f2;
+            padding: 0.1em 0.2em;
+            border-radius: 4px;
+            font-family: "SFMono-Regular", Consolas, "Liberation Mono", Menlo, Courier, monospace;
+            font-size: 0.9em;
+        }}
+
+        pre {{
+            background-color: #333;
+            padding: 1rem;
+            border-radius: 8px;
+            overflow-x: auto;
+            margin-bottom: 1rem;
+            border: 1px solid var(--border-color);
+        }}
+        pre code {{
+            background: none;
+            padding: 0;
+            font-size: 0.85em;
+            color: #e0e0e0;
+        }}
+
+        table {{
+            border-collapse: collapse;
+            width: 100%;
+            margin-bottom: 1rem;
+            font-size: 0.9em;
+        }}
+        th, td {{
+            border: 1px solid var(--border-color);
+            padding: 0.5em;
+            text-align: left;
+        }}
+        th {{
+            background-color: #333;
+            font-weight: 600;
+            color: var(--primary-color);
+        }}
+
+        hr {{
+            border: none;
+            border-top: 2px solid var(--border-color);
+            margin: 2rem 0;
+        }}
+
+        strong, b {{
+            font-weight: 600;
+            color: var(--secondary-color);
+        }}
+        em, i {{
+            font-style: italic;
+        }}
+    </style>
+</head>
+"""
+
 
 def _calculate_reading_time(text: str) -> str:
     """
@@ -42,19 +241,36 @@ def _calculate_reading_time(text: str) -> str:
 
 
 class MarkdownRenderer:
-    def __init__(self):
-        self.md = MarkdownIt("commonmark", {"breaks": True}).disable("html_block").disable("html_inline")
+    # 渲染样式版本，修改 HTML 模板或样式时递增，使旧的渲染缓存（含磁盘缓存）失效
+    STYLE_VERSION = "1"
+    # Markdown 解析器无实例状态，在类上构建一次即可
+    md = MarkdownIt("commonmark", {"breaks": True}).disable(["html_block", "html_inline"])
+
+    def __init__(self, cache_dir: Path | None = None, file_uri: bool = False):
         self._p = None
         self._browser = None
+        self._context = None  # 所有渲染共用的浏览器上下文，每次渲染只新建页面
         self._init_lock = asyncio.Lock()
         self._render_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RENDERS)
         self._browser_failed = False  # 标记浏览器初始化是否失败
         self._last_browser_fail_time = 0.0  # 上次浏览器初始化失败的时间
         self._browser_retry_interval = 300.0  # 浏览器重试间隔（秒）
-        self._page_count = 0  # 跟踪打开的页面数
+        self._page_count = 0  # 跟踪正在使用的页面数
+        # 空闲页面池：渲染成功后的页面留待复用，省去每次新建页面的开销
+        self._idle_pages: list = []
         self._max_pages = 50  # 最大页面数限制
         self._render_timeout = 30.0  # 单次渲染超时（秒）
         self._help_image_cache: bytes | None = None
+        # 渲染结果 LRU 缓存，键为内容的 blake2b 摘要
+        self._render_cache: OrderedDict[bytes, bytes] = OrderedDict()
+        # 与渲染缓存同键的 data URI 缓存，避免重复 base64 编码
+        self._data_uri_cache: OrderedDict[bytes, str] = OrderedDict()
+        # 可选的磁盘缓存目录，进程重启后仍可命中
+        self._cache_dir = cache_dir
+        if self._cache_dir:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+        # 直接以磁盘缓存文件的 file:// 路径发送图片，需要磁盘缓存
+        self._file_uri = file_uri and cache_dir is not None
         
     def clear_help_cache(self):
         """清除帮助图片缓存"""
@@ -91,6 +307,8 @@ class MarkdownRenderer:
                     LOG.warning(f"关闭旧浏览器失败: {e}")
                 finally:
                     self._browser = None
+                    self._context = None
+                    self._idle_pages.clear()
             
             if self._p:
                 try:
@@ -133,16 +351,29 @@ class MarkdownRenderer:
             try:
                 self._p = await async_playwright().start()
                 try:
-                    self._browser = await self._p.chromium.launch()
+                    self._browser = await self._p.chromium.launch(args=_BROWSER_ARGS)
                 except Exception as e:
                     LOG.warning(f"使用默认参数启动浏览器失败，尝试使用 --no-sandbox: {e}")
-                    self._browser = await self._p.chromium.launch(args=["--no-sandbox"])
+                    self._browser = await self._p.chromium.launch(args=[*_BROWSER_ARGS, "--no-sandbox"])
+                # 上下文只创建一次，避免 browser.new_page() 每次隐式新建上下文
+                self._context = await self._browser.new_context(
+                    viewport={"width": RENDER_WIDTH, "height": 100}
+                )
+                await self._context.route("**/*", _block_external_resources)
                 
                 LOG.info("Playwright 浏览器初始化成功")
                 self._page_count = 0
                 return self._browser
             except Exception as e:
                 LOG.error(f"初始化 Playwright 浏览器失败: {e}")
+                if self._browser:
+                    try:
+                        await self._browser.close()
+                    except Exception:
+                        pass
+                    self._browser = None
+                self._context = None
+                self._idle_pages.clear()
                 self._browser_failed = True
                 self._last_browser_fail_time = time.time()
                 # 清理可能部分初始化的资源
@@ -154,6 +385,35 @@ class MarkdownRenderer:
                     self._p = None
                 return None
 
+    async def _acquire_page(self):
+        """从空闲池取出一个页面，池为空时新建"""
+        while self._idle_pages:
+            page = self._idle_pages.pop()
+            if not page.is_closed():
+                break
+        else:
+            page = await self._context.new_page()
+        self._page_count += 1
+        return page
+
+    @staticmethod
+    async def _ensure_viewport_width(page, width: int):
+        """池中页面可能被设置过其他宽度，仅在不一致时才调整视口"""
+        viewport = page.viewport_size
+        if not viewport or viewport["width"] != width:
+            await page.set_viewport_size({"width": width, "height": 100})
+
+    async def _release_page(self, page, reusable: bool):
+        """归还页面：渲染成功且池未满时放回空闲池，否则关闭"""
+        self._page_count = max(0, self._page_count - 1)
+        if reusable and not page.is_closed() and len(self._idle_pages) < MAX_CONCURRENT_RENDERS:
+            self._idle_pages.append(page)
+            return
+        try:
+            await page.close()
+        except Exception as e:
+            LOG.warning(f"关闭页面时出错: {e}")
+
     async def close(self):
         """
         关闭渲染器并清理资源。
@@ -170,6 +430,8 @@ class MarkdownRenderer:
                 LOG.warning(f"关闭浏览器失败: {e}")
             finally:
                 self._browser = None
+                self._context = None
+                self._idle_pages.clear()
         
         # 再停止 Playwright
         if self._p:
@@ -193,14 +455,22 @@ class MarkdownRenderer:
         :param extra_text: 显示在左上角的可选附加文本。
         :return: 成功则返回图片的二进制数据 (bytes)，否则返回 None。
         """
+        cache_key = self._render_cache_key(markdown_text, extra_text)
+        cached = await self._get_cached_render(cache_key)
+        if cached is not None:
+            return cached
+
         # 使用信号量限制并发数
         async with self._render_semaphore:
             try:
                 # 添加总体超时控制
-                return await asyncio.wait_for(
+                img = await asyncio.wait_for(
                     self._render_markdown_impl(markdown_text, extra_text),
                     timeout=self._render_timeout
                 )
+                if img:
+                    await self._put_cached_render(cache_key, img)
+                return img
             except asyncio.TimeoutError:
                 LOG.error(f"Markdown 渲染超时（{self._render_timeout}s）")
                 return None
@@ -208,169 +478,139 @@ class MarkdownRenderer:
                 LOG.error(f"Markdown 渲染失败: {e}", exc_info=True)
                 return None
 
+    async def render_markdown_data_uri(
+        self, markdown_text: str, extra_text: str | None = None
+    ) -> str | None:
+        """
+        将 Markdown 文本渲染为可直接发送的图片 data URI。
+
+        :param markdown_text: 要渲染的 Markdown 字符串。
+        :param extra_text: 显示在左上角的可选附加文本。
+        :return: 成功则返回 data URI 字符串，否则返回 None。
+        """
+        cache_key = self._render_cache_key(markdown_text, extra_text)
+        data_uri = self._data_uri_cache.get(cache_key)
+        if data_uri is not None:
+            self._data_uri_cache.move_to_end(cache_key)
+            return data_uri
+
+        img = await self.render_markdown(markdown_text, extra_text)
+        if not img:
+            return None
+        data_uri = image_data_uri(img, RENDER_IMAGE_FORMAT)
+        self._data_uri_cache[cache_key] = data_uri
+        while len(self._data_uri_cache) > RENDER_CACHE_SIZE:
+            self._data_uri_cache.popitem(last=False)
+        return data_uri
+
+    async def render_markdown_image_uri(
+        self, markdown_text: str, extra_text: str | None = None
+    ) -> str | None:
+        """
+        将 Markdown 文本渲染为可直接发送的图片 URI。
+
+        启用 file_uri 时返回磁盘缓存文件的 file:// 路径，省去 base64 编码与
+        大字符串拼接；否则（或文件不可用时）返回 data URI。
+
+        :param markdown_text: 要渲染的 Markdown 字符串。
+        :param extra_text: 显示在左上角的可选附加文本。
+        :return: 成功则返回图片 URI，否则返回 None。
+        """
+        if not self._file_uri:
+            return await self.render_markdown_data_uri(markdown_text, extra_text)
+
+        assert self._cache_dir is not None
+        img = await self.render_markdown(markdown_text, extra_text)
+        if not img:
+            return None
+        path = self._cache_dir / f"{self._render_cache_key(markdown_text, extra_text).hex()}{_RENDER_SUFFIX}"
+        if not path.exists():
+            # 落盘失败时退回 data URI
+            return await self.render_markdown_data_uri(markdown_text, extra_text)
+        return path.resolve().as_uri()
+
+    @classmethod
+    def _render_cache_key(cls, markdown_text: str, extra_text: str | None) -> bytes:
+        """计算渲染缓存键：样式版本、图片格式、Markdown 与附加文本的 blake2b 摘要"""
+        salt = f"{cls.STYLE_VERSION}:{RENDER_IMAGE_FORMAT}".encode("utf-8")
+        hasher = hashlib.blake2b(markdown_text.encode("utf-8"), digest_size=16, salt=salt)
+        hasher.update(b"\0" + (extra_text or "").encode("utf-8"))
+        return hasher.digest()
+
+    def _remember_render(self, cache_key: bytes, img: bytes):
+        """写入内存 LRU 缓存"""
+        self._render_cache[cache_key] = img
+        self._render_cache.move_to_end(cache_key)
+        while len(self._render_cache) > RENDER_CACHE_SIZE:
+            self._render_cache.popitem(last=False)
+
+    async def _get_cached_render(self, cache_key: bytes) -> bytes | None:
+        """依次查询内存缓存和磁盘缓存，未命中返回 None"""
+        cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            self._render_cache.move_to_end(cache_key)
+            return cached
+
+        if not self._cache_dir:
+            return None
+        path = self._cache_dir / f"{cache_key.hex()}{_RENDER_SUFFIX}"
+        try:
+            async with aiofiles.open(path, "rb") as f:
+                cached = await f.read()
+            # 刷新 mtime，供磁盘缓存按最近使用淘汰
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            LOG.warning(f"读取渲染缓存 {path.name} 失败: {e}")
+            return None
+        self._remember_render(cache_key, cached)
+        return cached
+
+    async def _put_cached_render(self, cache_key: bytes, img: bytes):
+        """写入内存缓存，并在配置了磁盘缓存时落盘"""
+        self._remember_render(cache_key, img)
+        if not self._cache_dir:
+            return
+        path = self._cache_dir / f"{cache_key.hex()}{_RENDER_SUFFIX}"
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                await f.write(img)
+            await asyncio.to_thread(self._evict_disk_cache)
+        except OSError as e:
+            LOG.warning(f"写入渲染缓存 {path.name} 失败: {e}")
+
+    def _evict_disk_cache(self):
+        """按 mtime 淘汰最久未使用的磁盘缓存文件"""
+        assert self._cache_dir is not None
+        # 目录专用于渲染缓存；切换图片格式后遗留的旧格式文件也按 mtime 一并淘汰
+        files = [f for f in self._cache_dir.iterdir() if f.suffix in (".png", ".jpg")]
+        excess = len(files) - RENDER_DISK_CACHE_SIZE
+        if excess <= 0:
+            return
+        files.sort(key=lambda f: f.stat().st_mtime)
+        for f in files[:excess]:
+            f.unlink(missing_ok=True)
+
+    def _prepare_markdown(self, markdown_text: str) -> tuple[str, str]:
+        """统计阅读时间并将 Markdown 转为 HTML（在工作线程中调用）"""
+        return _calculate_reading_time(markdown_text), self.md.render(markdown_text)
+
     async def _render_markdown_impl(
         self, markdown_text: str, extra_text: str | None = None
     ) -> bytes | None:
         """渲染 Markdown 的内部实现"""
         try:
-            reading_time_info = _calculate_reading_time(markdown_text)
-            html_content = self.md.render(markdown_text)
-            extra_text_html = f"<span>{extra_text}</span>" if extra_text else "<span></span>"
-
-            # 添加一些基础样式以改善外观
-            html_with_style = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    :root {{
-                        --bg-color: #121212;
-                        --text-color: #e0e0e0;
-                        --primary-color: #bb86fc;
-                        --secondary-color: #03dac6;
-                        --surface-color: #1e1e1e;
-                        --border-color: #333;
-                    }}
-
-                    body {{
-                        position: relative;
-                        /* 最终渲染宽度 */
-                        width: {RENDER_WIDTH}px;
-                        box-sizing: border-box;
-
-                        /* 背景色 */
-                        background-color: var(--bg-color);
-                        color: var(--text-color);
-
-                        /* 内边距 */
-                        padding: {RENDER_PADDING}px;
-                        padding-top: {RENDER_TOP_PADDING}px;
-
-                        /* 字体 */
-                        font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif;
-                        
-                        /* 基础字号 */
-                        font-size: {BASE_FONT_SIZE}px;
-                        line-height: 1.6;
-                        letter-spacing: 0.1em;
-                        margin: 0 auto;
-
-                        word-break: break-all;
-                        word-wrap: break-word;
-                    }}
-
-                    .header-info {{
-                        position: absolute;
-                        top: 40px;
-                        left: {RENDER_PADDING}px;
-                        right: {RENDER_PADDING}px;
-                        display: flex;
-                        justify-content: space-between;
-                        font-size: {HEADER_FONT_SIZE}px;
-                        color: #888;
-                    }}
-
-                    /* 移植自 base.html 的样式 */
-                    h1, h2, h3, h4, h5, h6 {{
-                        color: var(--primary-color);
-                        margin-top: 1.5rem;
-                        margin-bottom: 1rem;
-                        font-weight: 600;
-                        line-height: 1.25;
-                    }}
-                    h1 {{ font-size: 1.8em; }}
-                    h2 {{ font-size: 1.5em; }}
-                    h3 {{ font-size: 1.3em; }}
-                    h4 {{ font-size: 1.1em; }}
-
-                    p {{
-                        margin-bottom: 1rem;
-                    }}
-
-                    a {{
-                        color: var(--secondary-color);
-                        text-decoration: none;
-                    }}
-                    a:hover {{
-                        text-decoration: underline;
-                    }}
-
-                    ul, ol {{
-                        margin-bottom: 1rem;
-                        padding-left: 2em;
-                    }}
-                    li {{
-                        margin-bottom: 0.5rem;
-                    }}
-
-                    blockquote {{
-                        border-left: 0.2em solid var(--primary-color);
-                        padding-left: 1em;
-                        margin: 1rem 0;
-                        font-style: italic;
-                        color: #b0b0b0;
-                        background-color: rgba(187, 134, 252, 0.05);
-                        padding: 0.5em 1em;
-                        border-radius: 0 8px 8px 0;
-                    }}
-
-                    code {{
-                        background-color: #333;
-                        color: #f8f8f2;
-                        padding: 0.1em 0.2em;
-                        border-radius: 4px;
-                        font-family: "SFMono-Regular", Consolas, "Liberation Mono", Menlo, Courier, monospace;
-                        font-size: 0.9em;
-                    }}
-
-                    pre {{
-                        background-color: #333;
-                        padding: 1rem;
-                        border-radius: 8px;
-                        overflow-x: auto;
-                        margin-bottom: 1rem;
-                        border: 1px solid var(--border-color);
-                    }}
-                    pre code {{
-                        background: none;
-                        padding: 0;
-                        font-size: 0.85em;
-                        color: #e0e0e0;
-                    }}
-
-                    table {{
-                        border-collapse: collapse;
-                        width: 100%;
-                        margin-bottom: 1rem;
-                        font-size: 0.9em;
-                    }}
-                    th, td {{
-                        border: 1px solid var(--border-color);
-                        padding: 0.5em;
-                        text-align: left;
-                    }}
-                    th {{
-                        background-color: #333;
-                        font-weight: 600;
-                        color: var(--primary-color);
-                    }}
-
-                    hr {{
-                        border: none;
-                        border-top: 2px solid var(--border-color);
-                        margin: 2rem 0;
-                    }}
-
-                    strong, b {{
-                        font-weight: 600;
-                        color: var(--secondary-color);
-                    }}
-                    em, i {{
-                        font-style: italic;
-                    }}
-                </style>
-            </head>
+            # 剧本可达数十万字，纯 Python 的解析与统计放到线程中执行，避免长时间占用事件循环
+            reading_time_info, html_content = await asyncio.to_thread(
+                self._prepare_markdown, markdown_text
+            )
+            # 附加文本可能含分支名等用户输入，需转义后再拼入页面
+            extra_text_html = f"<span>{extra_text.translate(_HTML_ESCAPE)}</span>" if extra_text else "<span></span>"
+
+            html_with_style = (
+                _MARKDOWN_PAGE_HEAD
+                + f"""
             <body>
                 <div class="header-info">
                     {extra_text_html}
@@ -380,6 +620,7 @@ class MarkdownRenderer:
             </body>
             </html>
             """
+            )
 
             # 检查浏览器健康状态
             browser = await self._ensure_browser()
@@ -397,36 +638,25 @@ class MarkdownRenderer:
                     return None
 
             page = None
-            page_created = False
+            reusable = False
             try:
-                page = await browser.new_page()
-                self._page_count += 1
-                page_created = True
+                page = await self._acquire_page()
                 
-                await page.set_viewport_size({"width": RENDER_WIDTH, "height": 100})
+                await self._ensure_viewport_width(page, RENDER_WIDTH)
                 await page.set_content(html_with_style, wait_until="networkidle")
                 await page.wait_for_timeout(50)
 
-                # 截图 body 元素以获得准确的内容尺寸
-                element = await page.query_selector("body")
-                image_bytes = await (
-                    element.screenshot() if element else page.screenshot(full_page=True)
-                )
+                # body 宽度等于视口且无外边距，整页截图即为 body 区域，省去查询元素的往返
+                image_bytes = await page.screenshot(full_page=True, **_SCREENSHOT_OPTIONS)
                 
                 LOG.debug("Markdown 成功渲染为图片二进制数据。")
+                reusable = True
                 return image_bytes
                 
             finally:
-                # 确保页面被关闭，即使出现异常
+                # 出错或超时的页面状态未知，直接关闭，不放回池中
                 if page:
-                    try:
-                        await page.close()
-                    except Exception as e:
-                        LOG.warning(f"关闭页面时出错: {e}")
-                
-                # 无论页面关闭是否成功，只要创建了页面计数，就进行递减
-                if page_created:
-                    self._page_count = max(0, self._page_count - 1)
+                    await self._release_page(page, reusable)
 
         except Exception as e:
             # 确保 Playwright 的浏览器驱动已安装
@@ -491,17 +721,15 @@ class MarkdownRenderer:
                 return None
 
         page = None
-        page_created = False
+        reusable = False
         try:
-            page = await browser.new_page()
-            self._page_count += 1
-            page_created = True
+            page = await self._acquire_page()
             
             # 从 HTML 的 body 标签中获取宽度
             width_match = re.search(r'body\s*\{[^}]*width:\s*(\d+)px;', html_content)
             render_width = int(width_match.group(1)) if width_match else RENDER_WIDTH
 
-            await page.set_viewport_size({"width": render_width, "height": 100})
+            await self._ensure_viewport_width(page, render_width)
             await page.set_content(html_content, wait_until="networkidle")
             await page.wait_for_timeout(50)
 
@@ -510,13 +738,8 @@ class MarkdownRenderer:
                 element.screenshot() if element else page.screenshot(full_page=True)
             )
             
+            reusable = True
             return image_bytes
         finally:
             if page:
-                try:
-                    await page.close()
-                except Exception as e:
-                    LOG.warning(f"关闭页面时出错: {e}")
-            
-            if page_created:
-                self._page_count = max(0, self._page_count - 1)
+                await self._release_page(page, reusable)
@@ -1,9 +1,113 @@
-import base64
+import asyncio
+import binascii
+import json
+from datetime import datetime
+from typing import Awaitable, Sequence
+
+from ncatbot.utils import get_log
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时回退到标准库
+    orjson = None
+
+try:
+    import pybase64
+except ImportError:  # pybase64 提供 SIMD 加速的编码，缺失时回退到标准库
+    pybase64 = None
 
 # 导入常量，保持向后兼容
-from .constants import EMOJI
+from .constants import EMOJI, EMOJI_STR
+
+LOG = get_log(__name__)
+
+# 持有后台任务的强引用，防止任务在完成前被垃圾回收
+_background_tasks: set[asyncio.Future] = set()
+
+_PNG_DATA_URI_PREFIX = "data:image/png;base64,"
+
+
+def config_flag(config, key: str) -> bool:
+    """读取布尔型配置项；配置值可能是字符串，只有 "true"/"1"（不区分大小写）视为开启"""
+    return str(config.get(key, False)).lower() in ("true", "1")
 
 
 def bytes_to_base64(b: bytes) -> str:
     """将字节数据转换为Base64字符串"""
-    return base64.b64encode(b).decode("utf-8")
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(b)
+    # 直接调用 binascii，省去 base64 模块的包装与额外拷贝
+    return binascii.b2a_base64(b, newline=False).decode("ascii")
+
+
+def png_data_uri(b: bytes) -> str:
+    """将 PNG 字节数据转换为 data URI"""
+    return _PNG_DATA_URI_PREFIX + bytes_to_base64(b)
+
+
+def image_data_uri(b: bytes, fmt: str = "png") -> str:
+    """将指定格式（png/jpeg）的图片字节数据转换为 data URI"""
+    if fmt == "png":
+        return png_data_uri(b)
+    return f"data:image/{fmt};base64," + bytes_to_base64(b)
+
+
+def json_loads(s: str | bytes):
+    """解析 JSON，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def _json_default(obj):
+    """JSON 无法直接表示的类型：集合转为列表，datetime 转为 ISO 8601 字符串"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(obj) -> str:
+    """
+    序列化为紧凑的 JSON 字符串，优先使用 orjson。
+
+    集合与 datetime 可直接序列化（orjson 原生处理 datetime），调用方无需预先转换。
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def run_in_background(aw: Awaitable, description: str) -> asyncio.Future:
+    """
+    在后台执行不影响正确性的副作用（如贴表情），调用方无需等待。
+
+    Args:
+        aw: 要执行的协程或 Future（如 asyncio.gather 的结果）
+        description: 用于日志的简短描述
+
+    Returns:
+        asyncio.Future: 对应的后台任务
+    """
+    task = asyncio.ensure_future(aw)
+    _background_tasks.add(task)
+
+    def _on_done(t: asyncio.Future):
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            LOG.warning(f"后台任务「{description}」失败: {t.exception()}")
+
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def add_reactions(api, message_id: str, emoji_ids: Sequence[int]):
+    """并发为消息贴上一组表情，单个失败仅记录警告"""
+    results = await asyncio.gather(
+        *(api.set_msg_emoji_like(message_id, str(emoji_id)) for emoji_id in emoji_ids),
+        return_exceptions=True,
+    )
+    for emoji_id, result in zip(emoji_ids, results):
+        if isinstance(result, Exception):
+            LOG.warning(f"为消息 {message_id} 贴表情 {emoji_id} 失败: {result}")
@@ -1,4 +1,4 @@
-import time
+import asyncio
 from ncatbot.plugin_system import NcatBotPlugin, command_registry, group_filter
 from ncatbot.core.event import GroupMessageEvent
 from ncatbot.core.event.message_segment import At
@@ -6,6 +6,22 @@ from ncatbot.utils import get_log
 
 LOG = get_log("GroupFileManager")
 
+# 并发删除文件时允许同时进行的 API 调用数
+DELETE_CONCURRENCY = 8
+# 删除确认的有效期（秒）
+CONFIRMATION_TIMEOUT_SECONDS = 60
+
+def _is_exact_text(message, target: str) -> bool:
+    """判断消息纯文本（去除首尾空白）是否恰好为 target，文本过长时提前返回"""
+    text = ""
+    for seg in message.filter_text():
+        text += seg.text
+        # 去除首尾空白后已长于 target 时，后续文本只会让其更长，不可能再匹配
+        if len(text.strip()) > len(target):
+            return False
+    return text.strip() == target
+
+
 class GroupFileManagerPlugin(NcatBotPlugin):
     name = "GroupFileManager"
     version = "1.0.0"
@@ -13,7 +29,8 @@ class GroupFileManagerPlugin(NcatBotPlugin):
     author = "Cline"
 
     async def on_load(self):
-        self.confirmation_pending = {}
+        # pending_key -> 到期自动移除该条目的定时器
+        self.confirmation_pending: dict[str, asyncio.TimerHandle] = {}
         LOG.info(f"插件 {self.name} 加载成功")
 
     @group_filter
@@ -23,28 +40,21 @@ class GroupFileManagerPlugin(NcatBotPlugin):
         user_id = event.user_id
         pending_key = f"{group_id}_{user_id}"
 
-        if pending_key in self.confirmation_pending:
-            pending_info = self.confirmation_pending[pending_key]
-            
-            # 检查是否超时
-            if time.time() - pending_info["timestamp"] > 60:
-                del self.confirmation_pending[pending_key]
-                return
+        # 超时的条目已由定时器移除
+        expire_handle = self.confirmation_pending.pop(pending_key, None)
+        if expire_handle is not None:
+            expire_handle.cancel()
 
             # 检查消息是否 at 了机器人
             at_segments = event.message.filter(At)
-            is_at_self = any(at.qq == str(event.self_id) for at in at_segments)
+            self_id = str(event.self_id)
+            is_at_self = any(at.qq == self_id for at in at_segments)
 
             # 通过拼接所有文本段来获取纯文本，这是更稳妥的方式
-            text_segments = event.message.filter_text()
-            plain_text = "".join(seg.text for seg in text_segments).strip()
-
-            if plain_text == "确认删除" and is_at_self:
-                del self.confirmation_pending[pending_key]
+            if is_at_self and _is_exact_text(event.message, "确认删除"):
                 await self._execute_deletion(group_id)
             # 如果消息不是预期的确认指令，则取消操作
             else:
-                del self.confirmation_pending[pending_key]
                 await event.reply("操作已取消。")
             
     @group_filter
@@ -58,7 +68,12 @@ class GroupFileManagerPlugin(NcatBotPlugin):
         user_id = event.user_id
         pending_key = f"{group_id}_{user_id}"
 
-        self.confirmation_pending[pending_key] = {"timestamp": time.time()}
+        previous = self.confirmation_pending.pop(pending_key, None)
+        if previous is not None:
+            previous.cancel()
+        self.confirmation_pending[pending_key] = asyncio.get_running_loop().call_later(
+            CONFIRMATION_TIMEOUT_SECONDS, self.confirmation_pending.pop, pending_key, None
+        )
         await event.reply("⚠️ 警告：此操作将删除群文件根目录下的所有文件，且不可恢复。\n请在 60 秒内 @我 并回复“确认删除”以继续操作。回复其他任何内容或超时将取消操作。")
 
     async def _execute_deletion(self, group_id: str):
@@ -76,13 +91,19 @@ class GroupFileManagerPlugin(NcatBotPlugin):
                 await self.api.post_group_msg(group_id, "根目录下没有文件。")
                 return
 
-            deleted_count = 0
-            for file_info in files:
-                try:
-                    await self.api.delete_group_file(group_id=group_id, file_id=file_info["file_id"])
-                    deleted_count += 1
-                except Exception as e:
-                    LOG.error(f"删除文件 {file_info.get('file_name')} ({file_info.get('file_id')}) 失败: {e}")
+            semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+            async def delete_file(file_info: dict) -> int:
+                async with semaphore:
+                    try:
+                        await self.api.delete_group_file(group_id=group_id, file_id=file_info["file_id"])
+                        return 1
+                    except Exception as e:
+                        LOG.error(f"删除文件 {file_info.get('file_name')} ({file_info.get('file_id')}) 失败: {e}")
+                        return 0
+
+            # 并发删除，信号量限制同时进行的请求数
+            deleted_count = sum(await asyncio.gather(*(delete_file(f) for f in files)))
 
             await self.api.post_group_msg(group_id, f"✅ 成功删除了 {deleted_count} 个根目录文件。")
 
@@ -3,12 +3,100 @@ from ncatbot.core.event import GroupMessageEvent, NoticeEvent
 from ncatbot.core.event.message_segment import File, At
 from ncatbot.core.helper.forward_constructor import ForwardConstructor
 from ncatbot.utils import get_log
-from collections import defaultdict
+from dataclasses import dataclass, field
 import asyncio
 import json
+import time
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时回退到标准库
+    orjson = None
 
 LOG = get_log(__name__)
 
+# 并发撤回消息时允许同时进行的 API 调用数
+DELETE_CONCURRENCY = 5
+# 机器人管理员状态缓存的有效期（秒），过期后重新查询，避免错过通知时长期使用旧值
+ADMIN_STATUS_TTL_SECONDS = 300
+# 撤回 API 的限速：每秒补充的令牌数与桶容量（允许的突发量）
+RECALL_RATE_PER_SECOND = 5
+RECALL_BURST = 10
+# 未单独配置的群共用的只读空设置，避免每条消息都新建 {}
+_EMPTY_GROUP_CONF = MappingProxyType({})
+# 数值型配置项及其类型、默认值；加载时统一转换一次，消息处理时直接使用
+_NUMERIC_SETTINGS = {
+    "message_threshold": (int, 33),
+    "forward_threshold": (int, 3),
+    "max_wait_seconds": (float, 0),
+}
+
+
+class BufferedMessage(NamedTuple):
+    """缓冲中的消息只保留打包与撤回所需的字段，不持有整个事件对象"""
+    user_id: str
+    nickname: str
+    message: Any  # MessageArray
+    message_id: str
+    sender_role: str
+
+
+# 拥有群管理权限的角色
+_ADMIN_ROLES = frozenset({"admin", "owner"})
+
+
+@dataclass(slots=True)
+class GroupState:
+    """单个群的运行时状态：消息缓冲、打包记录缓冲与机器人管理员状态缓存"""
+    messages: list[BufferedMessage] = field(default_factory=list)
+    forwards: list = field(default_factory=list)
+    is_admin: bool | None = None
+    admin_expires_at: float = 0.0  # 管理员状态缓存的过期时间（monotonic）
+
+
+def _json_loads(s: str):
+    """解析 JSON，优先使用 orjson；两者的解析错误均为 ValueError 子类"""
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
+
+
+def _parse_group_settings(raw: str) -> dict:
+    """解析字符串形式的 group_settings，先按标准 JSON 解析，失败再尝试单引号修复"""
+    try:
+        settings = _json_loads(raw)
+    except ValueError:
+        settings = _json_loads(raw.replace("'", "\""))
+    if not isinstance(settings, dict):
+        raise TypeError("group_settings 必须是字典")
+    return settings
+
+
+class TokenBucket:
+    """异步令牌桶限流器，按固定速率补充令牌，允许不超过容量的突发"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """取得一个令牌，令牌不足时等待补充；持锁等待保证先到先得"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
 class MessageCompressorPlugin(NcatBotPlugin):
     name = "MessageCompressorPlugin"
     version = "1.0.1"
@@ -19,8 +107,10 @@ class MessageCompressorPlugin(NcatBotPlugin):
         self.bot_id = None
         
         # 注册全局配置项
-        self.register_config("message_threshold", 33)
-        self.register_config("forward_threshold", 3)
+        self.register_config("message_threshold", _NUMERIC_SETTINGS["message_threshold"][1])
+        self.register_config("forward_threshold", _NUMERIC_SETTINGS["forward_threshold"][1])
+        # 缓冲区首条消息后最长等待秒数，到时即使未达阈值也打包；0 表示仅按条数触发
+        self.register_config("max_wait_seconds", _NUMERIC_SETTINGS["max_wait_seconds"][1])
         
         # 用于存储每个群的特定设置, a dict that will be persisted automatically
         self.register_config("group_settings", {})
@@ -29,17 +119,64 @@ class MessageCompressorPlugin(NcatBotPlugin):
         if isinstance(self.config.get("group_settings"), str):
             try:
                 # 尝试将字符串解析为字典
-                self.config["group_settings"] = json.loads(self.config["group_settings"].replace("'", "\""))
-            except (json.JSONDecodeError, TypeError):
+                self.config["group_settings"] = _parse_group_settings(self.config["group_settings"])
+            except (ValueError, TypeError):
                 # 如果解析失败，则重置为默认值
                 self.config["group_settings"] = {}
                 LOG.warning("group_settings 配置格式错误，已重置为默认值。")
-
-        # 使用 defaultdict 简化缓冲区初始化
-        self.message_buffers = defaultdict(list)
-        self.forward_buffers = defaultdict(list)
-        self.admin_status_cache = {}
-
+        self._normalize_numeric_settings()
+
+        # group_id -> 该群的缓冲区与管理员状态，一次查找即可取得全部状态
+        self._groups: dict[str, GroupState] = {}
+        # 每个群正在进行的打包任务，保证同群批次按顺序处理
+        self._flush_tasks: dict[str, asyncio.Task] = {}
+        # 每个群缓冲区的最长等待定时器
+        self._flush_timers: dict[str, asyncio.TimerHandle] = {}
+        self._delete_semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+        # 所有群共享的撤回限速器
+        self._recall_bucket = TokenBucket(RECALL_RATE_PER_SECOND, RECALL_BURST)
+        # 后台进行中的撤回任务，持有强引用并供关闭时等待
+        self._pending_recalls: set[asyncio.Task] = set()
+        # /compressor 子命令 -> (处理函数, 是否仅限管理员)
+        self._actions = {
+            "enable": (self._action_enable, True),
+            "on": (self._action_enable, True),
+            "disable": (self._action_disable, True),
+            "off": (self._action_disable, True),
+            "threshold": (self._action_threshold, True),
+            "status": (self._action_status, False),
+        }
+
+
+    async def on_close(self):
+        """停止定时器，等待进行中的打包与撤回完成"""
+        for timer in self._flush_timers.values():
+            timer.cancel()
+        self._flush_timers.clear()
+        pending = [*self._flush_tasks.values(), *self._pending_recalls]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _normalize_numeric_settings(self):
+        """将全局与各群的数值配置统一转换为数值类型，无效值回退为默认/全局配置"""
+        for key, (cast, default) in _NUMERIC_SETTINGS.items():
+            try:
+                self.config[key] = cast(self.config[key])
+            except (ValueError, TypeError):
+                self.config[key] = default
+                LOG.warning(f"{key} 配置无效，已重置为默认值 {default}。")
+
+        for group_id, group_conf in self.config["group_settings"].items():
+            if not isinstance(group_conf, dict):
+                continue
+            for key, (cast, _) in _NUMERIC_SETTINGS.items():
+                if key not in group_conf:
+                    continue
+                try:
+                    group_conf[key] = cast(group_conf[key])
+                except (ValueError, TypeError):
+                    del group_conf[key]
+                    LOG.warning(f"群 {group_id} 的 {key} 配置无效，已改用全局配置。")
 
     async def _fetch_bot_admin_status(self, group_id: str) -> bool:
         """强制从 API 获取机器人是否为群管理员或群主，并更新缓存。"""
@@ -50,17 +187,30 @@ class MessageCompressorPlugin(NcatBotPlugin):
         try:
             member_info = await self.api.get_group_member_info(group_id, self.bot_id)
             is_admin = member_info.role in ["admin", "owner"]
-            self.admin_status_cache[group_id] = is_admin  # 更新缓存
+            self._cache_admin_status(group_id, is_admin)  # 更新缓存
             return is_admin
         except Exception as e:
             LOG.error(f"获取群 {group_id} 的机器人成员信息失败: {e}")
-            self.admin_status_cache[group_id] = False  # 缓存失败结果
+            self._cache_admin_status(group_id, False)  # 缓存失败结果，过期后重试
             return False
 
+    def _state(self, group_id: str) -> GroupState:
+        """获取群状态，不存在时创建"""
+        state = self._groups.get(group_id)
+        if state is None:
+            state = self._groups[group_id] = GroupState()
+        return state
+
+    def _cache_admin_status(self, group_id: str, is_admin: bool):
+        state = self._state(group_id)
+        state.is_admin = is_admin
+        state.admin_expires_at = time.monotonic() + ADMIN_STATUS_TTL_SECONDS
+
     async def _is_bot_admin_in_group(self, group_id: str) -> bool:
         """检查机器人是否为群管理员或群主，优先使用缓存。"""
-        if group_id in self.admin_status_cache:
-            return self.admin_status_cache[group_id]
+        state = self._groups.get(group_id)
+        if state is not None and state.is_admin is not None and time.monotonic() < state.admin_expires_at:
+            return state.is_admin
         
         # 如果缓存中没有，则从 API 获取
         return await self._fetch_bot_admin_status(group_id)
@@ -75,7 +225,7 @@ class MessageCompressorPlugin(NcatBotPlugin):
         if event.notice_type == 'group_admin' and event.user_id == self.bot_id:
             group_id = event.group_id
             is_admin = (event.sub_type == 'set')
-            self.admin_status_cache[group_id] = is_admin
+            self._cache_admin_status(group_id, is_admin)
             status_text = "授予" if is_admin else "取消"
             LOG.info(f"检测到机器人在群 {group_id} 的管理员权限被{status_text}，已更新缓存。")
 
@@ -86,31 +236,94 @@ class MessageCompressorPlugin(NcatBotPlugin):
             self.bot_id = str(event.self_id)
 
         # 忽略命令消息或被禁用的群聊
-        if event.raw_message.startswith('/') or not self.config["group_settings"].get(event.group_id, {}).get("enabled", True):
+        if event.raw_message.startswith('/'):
+            return
+        group_conf = self.config["group_settings"].get(event.group_id) or _EMPTY_GROUP_CONF
+        if not group_conf.get("enabled", True):
             return
 
-        await self._handle_message_buffering(event)
+        await self._handle_message_buffering(event, group_conf)
 
-    async def _handle_message_buffering(self, event: GroupMessageEvent):
+    async def _handle_message_buffering(self, event: GroupMessageEvent, group_conf):
         """处理消息缓冲和触发压缩"""
         group_id = event.group_id
 
-        if event.message.is_forward_msg() or event.message.filter(File):
+        # 只需判断是否存在文件段，直接遍历消息段，不构造过滤后的列表
+        if event.message.is_forward_msg() or any(isinstance(seg, File) for seg in event.message):
             return
 
         # 将消息加入缓冲区
-        self.message_buffers[group_id].append(event)
+        state = self._state(group_id)
+        buffer = state.messages
+        buffer.append(BufferedMessage(
+            event.user_id, event.sender.nickname, event.message, event.message_id, event.sender.role
+        ))
 
         # 检查是否达到一级合并转发的阈值
-        group_conf = self.config["group_settings"].get(group_id, {})
-        message_threshold = int(group_conf.get("message_threshold", self.config["message_threshold"]))
+        message_threshold = group_conf.get("message_threshold", self.config["message_threshold"])
         
-        if len(self.message_buffers[group_id]) >= message_threshold:
-            messages_to_forward = self.message_buffers[group_id][:]
-            self.message_buffers[group_id].clear()
-            await self.create_and_send_level_one_forward(group_id, messages_to_forward)
+        # 追加、判断与取出之间没有 await，在事件循环中天然原子；
+        # 直接取走整个列表，无需复制再清空
+        if len(buffer) >= message_threshold:
+            timer = self._flush_timers.pop(group_id, None)
+            if timer is not None:
+                timer.cancel()
+            state.messages = []
+            self._schedule_flush(group_id, buffer)
+            return
+
+        if group_id not in self._flush_timers:
+            max_wait = group_conf.get("max_wait_seconds", self.config["max_wait_seconds"])
+            if max_wait > 0:
+                self._flush_timers[group_id] = asyncio.get_running_loop().call_later(
+                    max_wait, self._flush_on_timeout, group_id
+                )
+
+    def _flush_on_timeout(self, group_id: str):
+        """最长等待时间已到，打包缓冲区中已有的消息"""
+        self._flush_timers.pop(group_id, None)
+        # 单条消息无需打包，留待后续消息凑批
+        state = self._groups.get(group_id)
+        if state is not None and len(state.messages) >= 2:
+            batch, state.messages = state.messages, []
+            self._schedule_flush(group_id, batch)
+
+    def _schedule_flush(self, group_id: str, messages: list[BufferedMessage]):
+        """在后台执行打包与撤回，避免阻塞消息处理"""
+        previous = self._flush_tasks.get(group_id)
+        task = asyncio.create_task(self._flush(group_id, messages, previous))
+        self._flush_tasks[group_id] = task
+        task.add_done_callback(lambda t: self._on_flush_done(group_id, t))
+
+    def _on_flush_done(self, group_id: str, task: asyncio.Task):
+        if self._flush_tasks.get(group_id) is task:
+            del self._flush_tasks[group_id]
+
+    async def _flush(self, group_id: str, messages: list[BufferedMessage], previous: asyncio.Task | None):
+        # 等待同群上一批完成，保持转发顺序
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self.create_and_send_level_one_forward(group_id, messages)
+
+    def _spawn_recall(self, message_ids: list):
+        """在后台撤回消息，使下一批打包无需等待撤回完成"""
+        if not message_ids:
+            return
+        task = asyncio.create_task(self._delete_messages(message_ids))
+        self._pending_recalls.add(task)
+        task.add_done_callback(self._pending_recalls.discard)
 
-    async def create_and_send_level_one_forward(self, group_id: str, messages: list[GroupMessageEvent]):
+    async def _delete_messages(self, message_ids: list):
+        """并发撤回消息，信号量限制同时进行的 API 调用数，令牌桶限制整体速率"""
+        async def delete(msg_id):
+            async with self._delete_semaphore:
+                await self._recall_bucket.acquire()
+                await self.api.delete_msg(msg_id)
+
+        # 忽略撤回失败的消息
+        await asyncio.gather(*(delete(msg_id) for msg_id in message_ids), return_exceptions=True)
+
+    async def create_and_send_level_one_forward(self, group_id: str, messages: list[BufferedMessage]):
         """创建并发送一级合并转发"""
         if not self.bot_id:
             return  # 如果 bot_id 未知，则无法继续
@@ -119,7 +332,7 @@ class MessageCompressorPlugin(NcatBotPlugin):
             # 构造转发内容
             forward_constructor = ForwardConstructor(self.bot_id, "消息摘要")
             for msg in messages:
-                forward_constructor.attach(msg.message, user_id=msg.user_id, nickname=msg.sender.nickname)
+                forward_constructor.attach(msg.message, user_id=msg.user_id, nickname=msg.nickname)
             
             forward_msg = forward_constructor.to_forward()
 
@@ -131,30 +344,30 @@ class MessageCompressorPlugin(NcatBotPlugin):
             # 检查 bot 是否为管理员或群主（使用缓存），仅用于决定是否撤回
             if await self._is_bot_admin_in_group(group_id):
                 # 撤回原始消息
+                to_delete = []
+                bot_id = self.bot_id
                 for msg in messages:
-                    at_segments = msg.message.filter(At)
-                    is_at_self = any(at.qq == str(self.bot_id) for at in at_segments)
-                    if self._is_group_admin(msg) or msg.user_id == self.bot_id or is_at_self:
+                    # 先做廉价判断，只有需要时才遍历消息段检查是否 @ 了机器人
+                    if msg.sender_role in _ADMIN_ROLES or msg.user_id == bot_id:
+                        continue
+                    if any(isinstance(seg, At) and seg.qq == bot_id for seg in msg.message):
                         continue
-                    await asyncio.sleep(0.2) # 短暂延迟以避免过于频繁的 API 调用
-                    try:
-                        await self.api.delete_msg(msg.message_id)
-                    except Exception:
-                        pass # 忽略撤回失败的消息
+                    to_delete.append(msg.message_id)
+                self._spawn_recall(to_delete)
 
             # 将新发送的合并转发加入二级缓冲区
-            self.forward_buffers[group_id].append(sent_forward_info)
+            state = self._state(group_id)
+            state.forwards.append(sent_forward_info)
 
             # 检查二级合并转发条件
             group_conf = self.config["group_settings"].get(group_id, {})
-            forward_threshold = int(group_conf.get("forward_threshold", self.config["forward_threshold"]))
-            if len(self.forward_buffers[group_id]) >= forward_threshold:
-                forwards_to_nest = self.forward_buffers[group_id][:]
-                self.forward_buffers[group_id].clear()
+            forward_threshold = group_conf.get("forward_threshold", self.config["forward_threshold"])
+            if len(state.forwards) >= forward_threshold:
+                forwards_to_nest, state.forwards = state.forwards, []
                 await self.create_and_send_level_two_forward(group_id, forwards_to_nest)
 
-        except Exception as e:
-            LOG.error(f"创建一级合并转发时出错: {e}")
+        except Exception:
+            LOG.exception("创建一级合并转发时出错")
 
     async def create_and_send_level_two_forward(self, group_id: str, forward_message_ids: list[str]):
         """创建并发送嵌套的二级合并转发"""
@@ -173,15 +386,10 @@ class MessageCompressorPlugin(NcatBotPlugin):
             await self.api.post_group_forward_msg(group_id, nested_forward_msg)
 
             # 撤回一级合并转发消息
-            for msg_id in forward_message_ids:
-                await asyncio.sleep(0.2)
-                try:
-                    await self.api.delete_msg(msg_id)
-                except Exception:
-                    pass # 忽略撤回失败
+            await self._delete_messages(forward_message_ids)
 
-        except Exception as e:
-            LOG.error(f"创建二级合并转发时出错: {e}")
+        except Exception:
+            LOG.exception("创建二级合并转发时出错")
 
     # --- Admin Commands ---
 
@@ -192,94 +400,94 @@ class MessageCompressorPlugin(NcatBotPlugin):
         if self.bot_id is None:
             self.bot_id = str(event.self_id)
 
-        group_id = event.group_id
-        
-        admin_actions = ["enable", "on", "disable", "off", "threshold"]
-        if action in admin_actions:
-            if not (self._is_group_admin(event) or self.rbac_manager.user_has_role(event.user_id, "root")):
-                await event.reply("抱歉，只有群管理员、群主或root用户才能使用此命令。")
-                return
+        entry = self._actions.get(action)
+        if entry is None:
+            await event.reply(
+                "用法: /compressor <action>\n"
+                "action 可为: enable, disable, threshold, status"
+            )
+            return
 
-            if action in ["enable", "on"]:
-                self.config["group_settings"].setdefault(group_id, {})["enabled"] = True
-                await event.reply("✅ 在本群已启用自动打包压缩功能。")
-                return
-            
-            elif action in ["disable", "off"]:
-                self.config["group_settings"].setdefault(group_id, {})["enabled"] = False
-                await event.reply("❌ 在本群已禁用自动打包压缩功能。")
-                return
+        handler, admin_only = entry
+        if admin_only and not (self._is_group_admin(event) or self.rbac_manager.user_has_role(event.user_id, "root")):
+            await event.reply("抱歉，只有群管理员、群主或root用户才能使用此命令。")
+            return
 
-            elif action == "threshold":
-                if not val1 or not val2:
-                    await event.reply("❌ 参数不足，请提供两个有效的数字作为阈值。\n用法: /compressor threshold <消息数> <转发数>")
-                    return
-                try:
-                    errors = []
-                    msg_threshold = int(val1)
-                    fwd_threshold = int(val2)
-
-                    if msg_threshold < 2:
-                        errors.append("消息数阈值不能小于2。")
-                    if fwd_threshold < 2:
-                        errors.append("转发数阈值不能小于2。")
-                    
-                    if not errors and msg_threshold * fwd_threshold > 100:
-                        errors.append("两个阈值的乘积不能超过100。")
-
-                    if errors:
-                        error_message = "❌ 设置失败：\n" + "\n".join(f"- {e}" for e in errors)
-                        await event.reply(error_message)
-                        return
-
-                    group_conf = self.config["group_settings"].setdefault(group_id, {})
-                    group_conf["message_threshold"] = msg_threshold
-                    group_conf["forward_threshold"] = fwd_threshold
-                    await event.reply(
-                        f"✅ 在本群的触发阈值已更新：\n"
-                        f"- 消息数达到 {msg_threshold} 条时打包\n"
-                        f"- 打包记录达到 {fwd_threshold} 条时再次打包"
-                    )
-                except (ValueError, TypeError):
-                    await event.reply("❌ 参数错误，请提供两个有效的数字作为阈值。\n用法: /compressor threshold <消息数> <转发数>")
-                finally:
-                    return
+        await handler(event, val1, val2)
 
-        elif action == "status":
-            settings = self.config["group_settings"].get(group_id, {})
-            enabled = settings.get("enabled", True)
-            # 强制刷新状态以获取最新信息
-            has_admin_privilege = await self._fetch_bot_admin_status(group_id)
-
-            is_msg_thresh_global = "message_threshold" not in settings
-            is_fwd_thresh_global = "forward_threshold" not in settings
-
-            msg_thresh = settings.get("message_threshold", self.config["message_threshold"])
-            fwd_thresh = settings.get("forward_threshold", self.config["forward_threshold"])
-
-            msg_thresh_str = f"{msg_thresh}{' (全局)' if is_msg_thresh_global else ''}"
-            fwd_thresh_str = f"{fwd_thresh}{' (全局)' if is_fwd_thresh_global else ''}"
-
-            # 获取当前缓冲区状态
-            msg_buffer_count = len(self.message_buffers.get(group_id, []))
-            fwd_buffer_count = len(self.forward_buffers.get(group_id, []))
-
-            status_text = (
-                f"--- 本群自动打包状态 ---\n"
-                f"功能状态: {'✅ 已启用' if enabled else '❌ 已禁用'}\n"
-                f"撤回权限: {'✅ 可用' if has_admin_privilege else '❌ 不可用'}\n"
-                f"一级阈值: {msg_thresh_str} 条消息\n"
-                f"二级阈值: {fwd_thresh_str} 条打包记录\n"
-                f"当前缓存: {msg_buffer_count} 条消息 | {fwd_buffer_count} 条打包记录\n"
-                f"--------------------------"
-            )
-            if is_msg_thresh_global or is_fwd_thresh_global:
-                status_text += "\n提示: 阈值后面带有 '(全局)' 字样表示当前使用的是默认配置。"
+    async def _action_enable(self, event: GroupMessageEvent, val1: str, val2: str):
+        self.config["group_settings"].setdefault(event.group_id, {})["enabled"] = True
+        await event.reply("✅ 在本群已启用自动打包压缩功能。")
+
+    async def _action_disable(self, event: GroupMessageEvent, val1: str, val2: str):
+        self.config["group_settings"].setdefault(event.group_id, {})["enabled"] = False
+        await event.reply("❌ 在本群已禁用自动打包压缩功能。")
 
-            await event.reply(status_text)
+    async def _action_threshold(self, event: GroupMessageEvent, val1: str, val2: str):
+        if not val1 or not val2:
+            await event.reply("❌ 参数不足，请提供两个有效的数字作为阈值。\n用法: /compressor threshold <消息数> <转发数>")
             return
+        try:
+            msg_threshold = int(val1)
+            fwd_threshold = int(val2)
+        except (ValueError, TypeError):
+            await event.reply("❌ 参数错误，请提供两个有效的数字作为阈值。\n用法: /compressor threshold <消息数> <转发数>")
+            return
+
+        errors = []
+        if msg_threshold < 2:
+            errors.append("消息数阈值不能小于2。")
+        if fwd_threshold < 2:
+            errors.append("转发数阈值不能小于2。")
         
+        if not errors and msg_threshold * fwd_threshold > 100:
+            errors.append("两个阈值的乘积不能超过100。")
+
+        if errors:
+            error_message = "❌ 设置失败：\n" + "\n".join(f"- {e}" for e in errors)
+            await event.reply(error_message)
+            return
+
+        group_conf = self.config["group_settings"].setdefault(event.group_id, {})
+        group_conf["message_threshold"] = msg_threshold
+        group_conf["forward_threshold"] = fwd_threshold
         await event.reply(
-            "用法: /compressor <action>\n"
-            "action 可为: enable, disable, threshold, status"
-        )
\ No newline at end of file
+            f"✅ 在本群的触发阈值已更新：\n"
+            f"- 消息数达到 {msg_threshold} 条时打包\n"
+            f"- 打包记录达到 {fwd_threshold} 条时再次打包"
+        )
+
+    async def _action_status(self, event: GroupMessageEvent, val1: str, val2: str):
+        group_id = event.group_id
+        settings = self.config["group_settings"].get(group_id, {})
+        enabled = settings.get("enabled", True)
+        # 强制刷新状态以获取最新信息
+        has_admin_privilege = await self._fetch_bot_admin_status(group_id)
+
+        is_msg_thresh_global = "message_threshold" not in settings
+        is_fwd_thresh_global = "forward_threshold" not in settings
+
+        msg_thresh = settings.get("message_threshold", self.config["message_threshold"])
+        fwd_thresh = settings.get("forward_threshold", self.config["forward_threshold"])
+
+        msg_thresh_str = f"{msg_thresh}{' (全局)' if is_msg_thresh_global else ''}"
+        fwd_thresh_str = f"{fwd_thresh}{' (全局)' if is_fwd_thresh_global else ''}"
+
+        # 获取当前缓冲区状态
+        state = self._groups.get(group_id)
+        msg_buffer_count = len(state.messages) if state else 0
+        fwd_buffer_count = len(state.forwards) if state else 0
+
+        status_text = (
+            f"--- 本群自动打包状态 ---\n"
+            f"功能状态: {'✅ 已启用' if enabled else '❌ 已禁用'}\n"
+            f"撤回权限: {'✅ 可用' if has_admin_privilege else '❌ 不可用'}\n"
+            f"一级阈值: {msg_thresh_str} 条消息\n"
+            f"二级阈值: {fwd_thresh_str} 条打包记录\n"
+            f"当前缓存: {msg_buffer_count} 条消息 | {fwd_buffer_count} 条打包记录\n"
+            f"--------------------------"
+        )
+        if is_msg_thresh_global or is_fwd_thresh_global:
+            status_text += "\n提示: 阈值后面带有 '(全局)' 字样表示当前使用的是默认配置。"
+
+        await event.reply(status_text)
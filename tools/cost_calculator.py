@@ -2,37 +2,78 @@
 
 import json
 import argparse
+import os
 import sys
-from decimal import Decimal, getcontext
+from decimal import Decimal
 
-# 设置 Decimal 的精度
-getcontext().prec = 10
+try:
+    import ijson
+except ImportError:  # ijson 为可选依赖，缺失时整体载入文件
+    ijson = None
+
+# 安装了 ijson 时，超过该大小的日志逐条流式解析，内存占用与文件大小无关
+STREAM_THRESHOLD_BYTES = 10 * 1024 * 1024
 
 # --- Gemini 2.5 Pro 价格配置 ---
-# 计价单位：每 1,000,000 (1M) tokens
-TOKENS_PER_UNIT = Decimal("1000000")
+# 计价单位：每 1,000,000 (1M) tokens；价格以美分整数表示，逐条累加全部使用整数运算，
+# 仅在最后换算为 Decimal 美元，结果精确且避免逐条 Decimal 运算的开销
+TOKENS_PER_UNIT = 1_000_000
+CENTS_PER_DOLLAR = 100
 # 标准层 (<= 200K) 价格
-STANDARD_THRESHOLD = Decimal("200000")
-STANDARD_INPUT_PRICE = Decimal("1.25")   # $1.25 / 1M input
-STANDARD_OUTPUT_PRICE = Decimal("10.00")  # $10.00 / 1M output
+STANDARD_THRESHOLD = 200_000
+STANDARD_INPUT_PRICE_CENTS = 125    # $1.25 / 1M input
+STANDARD_OUTPUT_PRICE_CENTS = 1000  # $10.00 / 1M output
 # 大上下文层 (> 200K) 价格
-LARGE_INPUT_PRICE = Decimal("2.50")     # $2.50 / 1M input
-LARGE_OUTPUT_PRICE = Decimal("15.00")    # $15.00 / 1M output
+LARGE_INPUT_PRICE_CENTS = 250    # $2.50 / 1M input
+LARGE_OUTPUT_PRICE_CENTS = 1500  # $15.00 / 1M output
 # -------------------------------
 
 
+def _stream_records(file_path):
+    """
+    以流式方式逐条产出 JSON 文件顶层列表中的记录。
+    顶层不是列表时返回 None。
+    """
+    f = open(file_path, 'rb')
+    # 跳过前导空白，检查顶层是否为列表
+    while (c := f.read(1)) and c.isspace():
+        pass
+    if c != b'[':
+        f.close()
+        return None
+    f.seek(0)
+
+    def records():
+        with f:
+            try:
+                yield from ijson.items(f, 'item')
+            except ijson.JSONError:
+                print(f"错误: 文件 '{file_path}' 不是有效的 JSON 格式。", file=sys.stderr)
+                sys.exit(1)
+
+    return records()
+
+
 def calculate_total_cost(file_path):
     """
     从 JSON 日志文件加载数据并计算总成本。
     此版本专门为 'gemini-2.5-pro' 模型设计。
     """
-    total_cost = Decimal("0.0")
-    total_input_tokens = 0
-    total_output_tokens = 0
-
+    # 按价格层分别累计 token 数，价格与 token 数成线性关系，
+    # 遍历结束后每层只需乘一次价格
+    standard_input_tokens = 0
+    standard_output_tokens = 0
+    large_input_tokens = 0
+    large_output_tokens = 0
+
+    streaming = False
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if ijson is not None and os.path.getsize(file_path) > STREAM_THRESHOLD_BYTES:
+            data = _stream_records(file_path)
+            streaming = True
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
     except FileNotFoundError:
         print(f"错误: 文件未找到 '{file_path}'", file=sys.stderr)
         sys.exit(1)
@@ -43,11 +84,14 @@ def calculate_total_cost(file_path):
         print(f"读取文件时发生未知错误: {e}", file=sys.stderr)
         sys.exit(1)
 
-    if not isinstance(data, list):
+    if (data is None) if streaming else not isinstance(data, list):
         print("错误: JSON 文件的顶层应为一个列表 (list)。", file=sys.stderr)
         sys.exit(1)
 
-    print(f"正在处理 {len(data)} 条记录 (仅限 gemini-2.5-pro)...\n")
+    if streaming:
+        print("正在流式处理记录 (仅限 gemini-2.5-pro)...\n")
+    else:
+        print(f"正在处理 {len(data)} 条记录 (仅限 gemini-2.5-pro)...\n")
 
     for i, entry in enumerate(data):
         model = entry.get("model")
@@ -61,37 +105,33 @@ def calculate_total_cost(file_path):
             continue
 
         try:
-            input_tokens = Decimal(entry.get("input_tokens", 0))
-            output_tokens = Decimal(entry.get("output_tokens", 0))
-            
-            input_price = Decimal("0.0")
-            output_price = Decimal("0.0")
+            input_tokens = int(entry.get("input_tokens", 0))
+            output_tokens = int(entry.get("output_tokens", 0))
 
             # --- 核心定价逻辑 ---
             if input_tokens <= STANDARD_THRESHOLD:
-                # 使用标准层价格
-                input_price = STANDARD_INPUT_PRICE
-                output_price = STANDARD_OUTPUT_PRICE
+                # 计入标准层
+                standard_input_tokens += input_tokens
+                standard_output_tokens += output_tokens
             else:
-                # 使用大上下文层价格
-                input_price = LARGE_INPUT_PRICE
-                output_price = LARGE_OUTPUT_PRICE
+                # 计入大上下文层
+                large_input_tokens += input_tokens
+                large_output_tokens += output_tokens
             # --------------------
-
-            # 计算成本
-            input_cost = (input_tokens / TOKENS_PER_UNIT) * input_price
-            output_cost = (output_tokens / TOKENS_PER_UNIT) * output_price
-            
-            entry_cost = input_cost + output_cost
-            
-            # 累加总数
-            total_cost += entry_cost
-            total_input_tokens += int(input_tokens)
-            total_output_tokens += int(output_tokens)
             
         except Exception as e:
             print(f"警告: 处理第 {i+1} 条记录 (模型: {model}) 时发生意外错误: {e}，已跳过。")
 
+    # 单位：美分 × token，除以 CENTS_PER_DOLLAR * TOKENS_PER_UNIT 即为美元
+    total_cost_scaled = (
+        standard_input_tokens * STANDARD_INPUT_PRICE_CENTS
+        + standard_output_tokens * STANDARD_OUTPUT_PRICE_CENTS
+        + large_input_tokens * LARGE_INPUT_PRICE_CENTS
+        + large_output_tokens * LARGE_OUTPUT_PRICE_CENTS
+    )
+    total_cost = Decimal(total_cost_scaled) / (CENTS_PER_DOLLAR * TOKENS_PER_UNIT)
+    total_input_tokens = standard_input_tokens + large_input_tokens
+    total_output_tokens = standard_output_tokens + large_output_tokens
     return total_cost, total_input_tokens, total_output_tokens
 
 
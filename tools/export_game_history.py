@@ -3,9 +3,16 @@ import sqlite3
 import json
 import argparse
 import os
-from typing import Any
+from pathlib import Path
+from itertools import chain
+from typing import Any, BinaryIO, Iterable, Iterator
 import datetime
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时回退到标准库
+    orjson = None
+
 # 注册新的时间戳转换器以解决 Python 3.12 中的 DeprecationWarning
 def adapt_datetime_iso(val):
     """将 datetime.datetime 转换为 ISO 8601 格式的字符串。"""
@@ -18,73 +25,150 @@ def convert_timestamp(val):
 sqlite3.register_adapter(datetime.datetime, adapt_datetime_iso)
 sqlite3.register_converter("timestamp", convert_timestamp)
 
+# 只读导出会话的页缓存大小（KiB）与 mmap 映射大小（字节）
+EXPORT_CACHE_SIZE_KIB = 64 * 1024
+EXPORT_MMAP_SIZE = 256 * 1024 * 1024
+
 def get_db_connection(db_path: str) -> sqlite3.Connection | None:
     """建立并返回一个数据库连接。"""
     try:
+        # 以只读 URI 打开：不会创建文件或获取写锁，可与机器人进程并存；
+        # 不使用 immutable=1，否则会忽略机器人尚未检查点的 WAL 内容。
         # 使用 detect_types 来让 aiosqlite 自动转换数据类型
-        conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        db_uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(db_uri, uri=True, detect_types=sqlite3.PARSE_DECLTYPES)
         conn.row_factory = sqlite3.Row  # 像 aiosqlite.Row 一样通过列名访问
+        # 导出只读：禁止写入，临时表放内存，增大页缓存并启用 mmap 加速递归查询；
+        # 日志模式由机器人侧设置（WAL），这里不做修改
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA cache_size=-{EXPORT_CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={EXPORT_MMAP_SIZE}")
         print(f"✅ 成功连接到数据库: {db_path}")
         return conn
     except sqlite3.Error as e:
         print(f"❌ 数据库连接失败: {e}")
         return None
 
-def get_games(conn: sqlite3.Connection) -> list[sqlite3.Row]:
-    """获取所有游戏。"""
-    cursor = conn.cursor()
-    cursor.execute("SELECT game_id, channel_id, system_prompt, head_branch_id FROM games ORDER BY updated_at DESC")
-    return cursor.fetchall()
+def get_games(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    """查询所有游戏并返回游标，由调用方按需分页读取；每个游戏的分支以 JSON 数组形式一并返回（branches 列）。"""
+    # 分支由相关子查询按 updated_at 倒序聚合，一次查询代替游戏、分支两次往返
+    query = """
+    SELECT g.game_id, g.channel_id, g.system_prompt, g.head_branch_id,
+        (
+            SELECT json_group_array(json_object(
+                'branch_id', b.branch_id, 'name', b.name, 'tip_round_id', b.tip_round_id
+            ))
+            FROM (
+                SELECT branch_id, name, tip_round_id FROM branches
+                WHERE game_id = g.game_id ORDER BY updated_at DESC
+            ) AS b
+        ) AS branches
+    FROM games g
+    ORDER BY g.updated_at DESC
+    """
+    return conn.execute(query)
 
-def get_branches(conn: sqlite3.Connection, game_id: int) -> list[sqlite3.Row]:
-    """获取指定游戏的所有分支。"""
-    cursor = conn.cursor()
-    cursor.execute("SELECT branch_id, name, tip_round_id FROM branches WHERE game_id = ? ORDER BY updated_at DESC", (game_id,))
-    return cursor.fetchall()
+def get_branches(game: sqlite3.Row) -> list[dict[str, Any]]:
+    """解析 get_games 返回的游戏行中聚合的分支列表。"""
+    return json.loads(game["branches"])
+
+# 选择游戏时每页显示的游戏数
+GAME_PAGE_SIZE = 20
+# 分批读取回合时每批的行数
+FETCH_BATCH_SIZE = 256
+# 祖先链最大回合数：父链数据损坏成环时，递归在此停止而不是无限进行
+MAX_ANCESTOR_ROUNDS = 100_000
+# 祖先链不超过该深度时直接在 Python 中逐条追溯父回合，超过则改用递归 CTE
+SHALLOW_CHASE_MAX_DEPTH = 1000
+
+def _chase_parent_ids(conn: sqlite3.Connection, round_id: int) -> list[int] | None:
+    """沿 parent_id 逐条追溯祖先，返回按时间正序排列的回合 ID。
+
+    每次只按主键取 parent_id，链条超过 SHALLOW_CHASE_MAX_DEPTH 时返回 None。
+    """
+    ids = []
+    rid = round_id
+    while rid != -1:
+        if len(ids) >= SHALLOW_CHASE_MAX_DEPTH:
+            return None
+        row = conn.execute("SELECT parent_id FROM rounds WHERE round_id = ?", (rid,)).fetchone()
+        if row is None:
+            break
+        ids.append(rid)
+        rid = row[0]
+    ids.reverse()
+    return ids
+
+def get_round_ancestors(conn: sqlite3.Connection, round_id: int) -> Iterator[sqlite3.Row]:
+    """逐批产出一个回合及其所有祖先，按时间正序排列。"""
+    # 常见的浅历史：逐条主键查询比递归 CTE 的临时表与迭代开销更小
+    ids = _chase_parent_ids(conn, round_id)
+    if ids is not None:
+        for rid in ids:
+            row = conn.execute(
+                "SELECT player_choice, assistant_response FROM rounds WHERE round_id = ?", (rid,)
+            ).fetchone()
+            if row is not None:
+                yield row
+        return
 
-def get_round_ancestors(conn: sqlite3.Connection, round_id: int) -> list[sqlite3.Row]:
-    """获取一个回合及其所有祖先，按时间正序排列。"""
+    # 只取导出需要的列，递归所需的 round_id/parent_id 仅在 CTE 内使用
     query = """
     WITH RECURSIVE ancestors AS (
-        SELECT *, 0 as depth 
+        SELECT round_id, parent_id, player_choice, assistant_response, 0 as depth 
         FROM rounds 
         WHERE round_id = ?
         
         UNION ALL
         
-        SELECT r.*, a.depth + 1 
+        SELECT r.round_id, r.parent_id, r.player_choice, r.assistant_response, a.depth + 1 
         FROM rounds r 
         JOIN ancestors a ON r.round_id = a.parent_id
         WHERE a.parent_id != -1
+        LIMIT ?
     )
-    SELECT * FROM ancestors ORDER BY depth DESC;
+    SELECT player_choice, assistant_response FROM ancestors ORDER BY depth DESC;
     """
     cursor = conn.cursor()
-    cursor.execute(query, (round_id,))
-    return cursor.fetchall()
+    cursor.arraysize = FETCH_BATCH_SIZE
+    cursor.execute(query, (round_id, MAX_ANCESTOR_ROUNDS))
+    while rows := cursor.fetchmany():
+        yield from rows
 
 
-def select_game(games: list[sqlite3.Row]) -> sqlite3.Row | None:
-    """让用户从列表中选择一个游戏。"""
-    if not games:
+def select_game(games: sqlite3.Cursor) -> sqlite3.Row | None:
+    """让用户从游戏列表中选择一个游戏，每次只读取并显示一页。"""
+    page = games.fetchmany(GAME_PAGE_SIZE)
+    if not page:
         print("🤔 未找到任何游戏。")
         return None
 
     print("\n请选择一个游戏:")
-    for i, game in enumerate(games):
-        print(f"  [{i+1}] Game ID: {game['game_id']} (Channel: {game['channel_id']})")
-    
+    shown: list[sqlite3.Row] = []
     while True:
-        try:
-            choice = int(input(f"请输入选项 (1-{len(games)}): "))
-            if 1 <= choice <= len(games):
-                return games[choice - 1]
-            else:
-                print("⚠️ 无效输入，请输入列表中的数字。")
-        except ValueError:
-            print("⚠️ 无效输入，请输入一个数字。")
+        for game in page:
+            shown.append(game)
+            print(f"  [{len(shown)}] Game ID: {game['game_id']} (Channel: {game['channel_id']})")
+
+        # 预取下一页，用于判断是否还有更多游戏
+        page = games.fetchmany(GAME_PAGE_SIZE)
+        more_hint = "，输入 n 显示更多" if page else ""
+        while True:
+            user_input = input(f"请输入选项 (1-{len(shown)}{more_hint}): ").strip()
+            if page and user_input.lower() == 'n':
+                break
+            try:
+                choice = int(user_input)
+            except ValueError:
+                print("⚠️ 无效输入，请输入一个数字。")
+                continue
+            if 1 <= choice <= len(shown):
+                return shown[choice - 1]
+            print("⚠️ 无效输入，请输入列表中的数字。")
 
-def select_branch(branches: list[sqlite3.Row], head_branch_id: int | None) -> sqlite3.Row | None:
+
+def select_branch(branches: list[dict[str, Any]], head_branch_id: int | None) -> dict[str, Any] | None:
     """让用户从列表中选择一个分支。"""
     if not branches:
         print("🤔 该游戏没有任何分支。")
@@ -106,17 +190,42 @@ def select_branch(branches: list[sqlite3.Row], head_branch_id: int | None) -> sq
             print("⚠️ 无效输入，请输入一个数字。")
 
 
-def export_history_to_json(game: sqlite3.Row, rounds: list[sqlite3.Row]) -> dict[str, Any]:
-    """将历史记录导出为指定的 JSON 格式。"""
-    history = []
+def _json_value(value: Any) -> bytes:
+    """将单个值序列化为 UTF-8 编码的 JSON（不转义非 ASCII 字符），优先使用 orjson。"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+# history 中每条消息在 json.dump(indent=4) 格式下的固定部分（位于第 2 层缩进）
+_USER_MESSAGE_PREFIX = b'        {\n            "role": "user",\n            "content": '
+_ASSISTANT_MESSAGE_PREFIX = b'        {\n            "role": "assistant",\n            "content": '
+_MESSAGE_SUFFIX = b'\n        }'
+
+def write_history_json(f: BinaryIO, game: sqlite3.Row, rounds: Iterable[sqlite3.Row]) -> None:
+    """
+    将历史记录导出为指定的 JSON 格式并逐条写入以二进制模式打开的文件。
+    输出与 json.dump(..., ensure_ascii=False, indent=4) 一致，但不在内存中构建完整结果。
+    """
+    f.write(b'{\n    "system_prompt": ')
+    f.write(_json_value(game["system_prompt"]))
+    f.write(b',\n    "history": [')
+    separator = b'\n'
     for round_data in rounds:
-        history.append({"role": "user", "content": round_data["player_choice"]})
-        history.append({"role": "assistant", "content": round_data["assistant_response"]})
+        # 每回合拼成一段字节后只写一次，减少缓冲写入调用
+        f.write(b''.join((
+            separator,
+            _USER_MESSAGE_PREFIX,
+            _json_value(round_data["player_choice"]),
+            _MESSAGE_SUFFIX,
+            b',\n',
+            _ASSISTANT_MESSAGE_PREFIX,
+            _json_value(round_data["assistant_response"]),
+            _MESSAGE_SUFFIX,
+        )))
+        separator = b',\n'
+    # 与 json.dump 一致：空列表输出为 []
+    f.write(b'\n    ]\n}' if separator != b'\n' else b']\n}')
 
-    return {
-        "system_prompt": game["system_prompt"],
-        "history": history
-    }
 
 def main():
     """主函数"""
@@ -152,7 +261,7 @@ def main():
             return
 
         # 2. 选择分支
-        branches = get_branches(conn, selected_game["game_id"])
+        branches = get_branches(selected_game)
         selected_branch = select_branch(branches, selected_game["head_branch_id"])
         if not selected_branch:
             return
@@ -163,20 +272,19 @@ def main():
 
         # 3. 获取并导出历史记录
         rounds = get_round_ancestors(conn, selected_branch["tip_round_id"])
-        if not rounds:
+        first_round = next(rounds, None)
+        if first_round is None:
             print("🤔 未能获取到任何回合历史。")
             return
         
-        output_data = export_history_to_json(selected_game, rounds)
-        
-        # 4. 保存到文件
+        # 4. 保存到文件（逐条写出，不在内存中构建完整结果）
         output_path = args.output
         if not output_path:
             output_filename = f"game_{selected_game['game_id']}_branch_{selected_branch['name']}.json"
             output_path = os.path.join(os.getcwd(), output_filename)
             
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=4)
+        with open(output_path, 'wb') as f:
+            write_history_json(f, selected_game, chain((first_round,), rounds))
         
         print(f"\n✅ 成功将历史记录导出到: {output_path}")
 
@@ -1,12 +1,28 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import codecs
+import mmap
 import os
 import re
 import argparse
 from pathlib import Path
-from typing import List, Tuple
+from operator import itemgetter
+from typing import List, Optional, Tuple
 
+# 文件名中的章节编号，如 "第12章"
+_CHAPTER_RE = re.compile(r'第(\d+)章')
+
+# 流式复制章节内容时每次读取的字符数
+COPY_CHUNK_SIZE = 1 << 20
+# 输出文件的写缓冲大小（字节），合并大部头时减少 write 系统调用次数
+OUTPUT_BUFFER_SIZE = 4 << 20
+# 提前提示内核预读的章节数
+PREFETCH_DEPTH = 8
+# 最大章节号不超过章节数的该倍数时，按章节号直接分桶放置（O(n)），否则退回排序
+BUCKET_SPARSITY_LIMIT = 4
+# 不小于该字节数的章节通过 mmap 直接写出原始字节，跳过解码与重新编码
+MMAP_MIN_SIZE = 1 << 20
 
 def extract_chapter_number(filename: str) -> int:
     """从文件名中提取章节编号
@@ -21,7 +37,7 @@ def extract_chapter_number(filename: str) -> int:
     Returns:
         章节编号，如果无法提取则返回 -1
     """
-    match = re.search(r'第(\d+)章', filename)
+    match = _CHAPTER_RE.search(filename)
     if match:
         return int(match.group(1))
     return -1
@@ -44,6 +60,97 @@ def extract_chapter_title(filename: str) -> str:
     return title
 
 
+def copy_stripped(infile, outfile, chunk_size: int = COPY_CHUNK_SIZE) -> None:
+    """流式复制文本内容，去除首尾空白
+    
+    结果与 outfile.write(infile.read().strip()) 相同，但内存中最多只保留一个分块。
+    
+    Args:
+        infile: 以文本模式打开的输入文件
+        outfile: 以文本模式打开的输出文件
+        chunk_size: 每次读取的字符数
+    """
+    started = False
+    pending = ""  # 暂缓写出的空白，只有其后还有内容时才写出
+    while chunk := infile.read(chunk_size):
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        body = chunk.rstrip()
+        if body:
+            outfile.write(pending)
+            outfile.write(body)
+            pending = chunk[len(body):]
+        else:
+            pending += chunk
+
+
+def _is_ascii_non_space(byte: int) -> bool:
+    """判断单个字节是否为可见 ASCII 字符（非空白）"""
+    return 0x21 <= byte <= 0x7E
+
+
+def copy_mapped(filepath: str, outfile, header: str, chunk_size: int = COPY_CHUNK_SIZE) -> bool:
+    """通过 mmap 将大章节的原始字节直接写入输出文件的底层缓冲
+    
+    仅当首尾字节均为非空白 ASCII（strip() 不会改变内容）、章节不含 \r
+    且系统换行符为 \n（文本模式无需转换）时使用，其余情况返回 False 由调用方走文本复制。
+    写出前按块校验 UTF-8，非 UTF-8 章节与文本模式一样抛出 UnicodeDecodeError，且不写出任何内容。
+    
+    Args:
+        filepath: 章节文件路径
+        outfile: 以文本模式打开的输出文件
+        header: 写在内容之前的文本
+        chunk_size: 校验 UTF-8 时每块的字节数
+        
+    Returns:
+        是否已写出
+    """
+    if os.linesep != '\n':
+        return False
+    with open(filepath, 'rb') as infile:
+        if os.fstat(infile.fileno()).st_size < MMAP_MIN_SIZE:
+            return False
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if (not _is_ascii_non_space(mm[0]) or not _is_ascii_non_space(mm[-1])
+                    or mm.find(b'\r') != -1):
+                return False
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            with memoryview(mm) as view:
+                for offset in range(0, len(view), chunk_size):
+                    with view[offset:offset + chunk_size] as chunk:
+                        decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+
+            outfile.write(header)
+            # 先把文本层缓冲的内容刷入底层，保证写出顺序
+            outfile.flush()
+            outfile.buffer.write(mm)
+    return True
+
+
+def prefetch_file(filepath: str) -> None:
+    """提示内核在后台预读文件（仅支持 posix_fadvise 的平台），失败时忽略
+    
+    预读与当前章节的复制并行进行，且不占用 Python 进程内存。
+    
+    Args:
+        filepath: 文件路径
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
 def get_sorted_chapter_files(input_dir: str) -> List[Tuple[int, str, str]]:
     """获取并排序章节文件
     
@@ -54,23 +161,40 @@ def get_sorted_chapter_files(input_dir: str) -> List[Tuple[int, str, str]]:
         排序后的 (章节号, 文件路径, 章节标题) 列表
     """
     chapter_files = []
+    max_num = 0
     
-    # 遍历目录中的所有 .txt 文件
-    for filename in os.listdir(input_dir):
-        if not filename.endswith('.txt'):
-            continue
-            
-        filepath = os.path.join(input_dir, filename)
-        chapter_num = extract_chapter_number(filename)
-        chapter_title = extract_chapter_title(filename)
-        
-        if chapter_num > 0:
-            chapter_files.append((chapter_num, filepath, chapter_title))
-        else:
-            print(f"⚠️ 警告: 无法从 '{filename}' 中提取章节编号，已跳过。")
+    # 遍历目录中的所有 .txt 文件；scandir 一次返回文件名、完整路径与文件类型，
+    # 无需再逐个拼接路径或 stat
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            filename = entry.name
+            if not filename.endswith('.txt') or not entry.is_file():
+                continue
+
+            chapter_num = extract_chapter_number(filename)
+            chapter_title = extract_chapter_title(filename)
+
+            if chapter_num > 0:
+                chapter_files.append((chapter_num, entry.path, chapter_title))
+                if chapter_num > max_num:
+                    max_num = chapter_num
+            else:
+                print(f"⚠️ 警告: 无法从 '{filename}' 中提取章节编号，已跳过。")
     
-    # 按章节号排序
-    chapter_files.sort(key=lambda x: x[0])
+    # 章节号通常从 1 开始连续编号：直接按章节号放入预分配的桶中，
+    # 同号章节保持扫描顺序（与稳定排序一致），空桶即缺失的章节
+    if max_num <= BUCKET_SPARSITY_LIMIT * len(chapter_files):
+        buckets: List[Optional[List[Tuple[int, str, str]]]] = [None] * max_num
+        for item in chapter_files:
+            bucket = buckets[item[0] - 1]
+            if bucket is None:
+                buckets[item[0] - 1] = [item]
+            else:
+                bucket.append(item)
+        return [item for bucket in buckets if bucket for item in bucket]
+
+    # 编号过于稀疏时分桶会浪费内存，退回按章节号排序
+    chapter_files.sort(key=itemgetter(0))
     
     return chapter_files
 
@@ -92,18 +216,24 @@ def merge_chapters(chapter_files: List[Tuple[int, str, str]], output_path: str,
     print()
     
     try:
-        with open(output_path, 'w', encoding='utf-8') as outfile:
+        with open(output_path, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as outfile:
+            for _, filepath, _ in chapter_files[:PREFETCH_DEPTH]:
+                prefetch_file(filepath)
+
             for idx, (chapter_num, filepath, chapter_title) in enumerate(chapter_files, 1):
+                # 保持预读窗口：处理第 idx 章时提示第 idx + PREFETCH_DEPTH 章
+                if idx + PREFETCH_DEPTH <= len(chapter_files):
+                    prefetch_file(chapter_files[idx + PREFETCH_DEPTH - 1][1])
+
+                # 记录章节起始位置，读取失败时截断回此处，不留下标题与不完整的内容
+                chapter_start = outfile.tell()
                 try:
-                    # 读取章节内容
-                    with open(filepath, 'r', encoding='utf-8') as infile:
-                        content = infile.read().strip()
-                    
-                    # 写入章节标题
-                    outfile.write(f"# {chapter_title}\n\n")
-                    
-                    # 写入章节内容
-                    outfile.write(content)
+                    # 写入章节标题与内容：大章节直接写出原始字节，其余流式复制，不将整章读入内存
+                    header = f"# {chapter_title}\n\n"
+                    if not copy_mapped(filepath, outfile, header):
+                        with open(filepath, 'r', encoding='utf-8') as infile:
+                            outfile.write(header)
+                            copy_stripped(infile, outfile)
                     
                     # 添加分隔符（最后一章除外）
                     if idx < len(chapter_files) and separator:
@@ -112,6 +242,8 @@ def merge_chapters(chapter_files: List[Tuple[int, str, str]], output_path: str,
                     print(f"✅ [{idx}/{len(chapter_files)}] {chapter_title}")
                     
                 except Exception as e:
+                    outfile.seek(chapter_start)
+                    outfile.truncate()
                     print(f"❌ 读取第{chapter_num}章时出错: {e}")
                     continue
         